@@ -0,0 +1,149 @@
+"""Redimensionamento de GIF e WEBP animados, quadro a quadro e em paralelo.
+
+O ``resize`` do Pillow só atua no quadro carregado, então uma animação
+redimensionada pelo caminho normal vira uma imagem estática. Aqui cada
+quadro é decodificado em sequência (o ``seek`` depende do quadro anterior),
+redimensionado em um pool de threads (o Pillow libera o GIL durante o
+``resize``) e entregue ao codificador na ordem original. A duração de cada
+quadro, o número de repetições e o descarte (GIF) são preservados.
+
+Só uma janela de quadros de origem é decodificada e redimensionada por vez,
+mas os codificadores GIF e WEBP do Pillow juntam todos os quadros
+redimensionados antes de gravar: a memória da saída cresce com o número de
+quadros, e o limite de pixels por pedido vale para a soma deles.
+"""
+
+import io
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+
+from PIL import Image
+
+from image_engine import (
+    ANIMATED_FORMATS,
+    METHOD_CROP,
+    QUALITY_FORMATS,
+    ResizeSpec,
+    check_output_budget,
+    intermediate_size,
+    resize_image,
+    resolve_anchor,
+)
+
+# Número de threads, configurável por variável de ambiente
+DEFAULT_FRAME_WORKERS = int(os.environ.get("REDIMENSIONADOR_FRAME_WORKERS", str(os.cpu_count() or 1)))
+
+# Quadros em processamento por thread antes de esperar o codificador
+FRAMES_AHEAD_PER_WORKER = 2
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DEFAULT_FRAME_WORKERS, thread_name_prefix="frames")
+        return _executor
+
+
+def is_animated(image: Image.Image) -> bool:
+    """Indica se a imagem tem mais de um quadro."""
+    return getattr(image, "n_frames", 1) > 1
+
+
+def frame_count(image: Image.Image) -> int:
+    return getattr(image, "n_frames", 1)
+
+
+def _iter_source_frames(image: Image.Image, durations: List[int], disposals: List[int]) -> Iterator[Image.Image]:
+    """Gera cada quadro completo em RGBA, anotando duração e descarte nas listas."""
+    for index in range(frame_count(image)):
+        image.seek(index)
+        # O WEBP só atualiza a duração do quadro ao carregá-lo
+        image.load()
+        durations.append(image.info.get("duration", 0))
+        disposals.append(getattr(image, "disposal_method", 0))
+        yield image.convert("RGBA")
+
+
+def iter_resized_frames(
+    image: Image.Image,
+    spec: ResizeSpec,
+    durations: List[int],
+    disposals: List[int],
+    workers: int = DEFAULT_FRAME_WORKERS,
+) -> Iterator[Image.Image]:
+    """Gera os quadros redimensionados na ordem original.
+
+    Até ``workers * FRAMES_AHEAD_PER_WORKER`` quadros ficam em processamento
+    ao mesmo tempo; o próximo só é decodificado quando o mais antigo é
+    consumido. ``durations`` e ``disposals`` são preenchidas à medida que os
+    quadros são lidos, sempre à frente do que já foi entregue.
+    """
+    frames = _iter_source_frames(image, durations, disposals)
+    first = next(frames)
+    if spec.method == METHOD_CROP:
+        # O corte automático é calculado uma vez, para a área não "pular" entre quadros
+        spec = resolve_anchor(first, intermediate_size(image.size, spec), spec)
+
+    if workers <= 1:
+        yield resize_image(first, spec)
+        for frame in frames:
+            yield resize_image(frame, spec)
+        return
+
+    executor = _get_executor()
+    window = max(1, workers * FRAMES_AHEAD_PER_WORKER)
+    in_flight = deque([executor.submit(resize_image, first, spec)])
+    for frame in frames:
+        in_flight.append(executor.submit(resize_image, frame, spec))
+        if len(in_flight) >= window:
+            yield in_flight.popleft().result()
+    while in_flight:
+        yield in_flight.popleft().result()
+
+
+def encode_animation(
+    data: bytes,
+    spec: ResizeSpec,
+    save_format: str,
+    quality: int = 95,
+    workers: int = DEFAULT_FRAME_WORKERS,
+) -> bytes:
+    """Redimensiona todos os quadros de ``data`` e codifica a animação em GIF ou WEBP.
+
+    Recebe os bytes do arquivo (e não uma imagem já aberta) porque o ``seek``
+    altera o estado da imagem, que pode estar compartilhada em cache. Todos
+    os quadros de saída ficam na memória até o fim da gravação, por isso o
+    limite de pixels é aplicado a quadros × tamanho de saída.
+    """
+    save_format = save_format.upper()
+    if save_format not in ANIMATED_FORMATS:
+        raise ValueError(f"Formato sem suporte a animação: {save_format}")
+    check_output_budget(spec)
+
+    with Image.open(io.BytesIO(data)) as image:
+        check_output_budget(spec, frames=frame_count(image))
+        loop = image.info.get("loop")
+        durations: List[int] = []
+        disposals: List[int] = []
+        frames = iter_resized_frames(image, spec, durations, disposals, workers)
+        first = next(frames)
+
+        # Os codificadores leem duração e descarte por índice, depois de receber o quadro
+        save_kwargs = {"save_all": True, "append_images": frames, "duration": durations}
+        if loop is not None:
+            save_kwargs["loop"] = loop
+        if save_format == "GIF":
+            save_kwargs["disposal"] = disposals
+        if save_format in QUALITY_FORMATS:
+            save_kwargs["quality"] = int(quality)
+
+        buffer = io.BytesIO()
+        first.save(buffer, format=save_format, **save_kwargs)
+        return buffer.getvalue()
@@ -0,0 +1,363 @@
+"""API HTTP local com a mesma lógica de presets, corte e padding da interface.
+
+Exemplo::
+
+    python api_server.py --port 8000 -w 4
+    curl --data-binary @foto.jpg -o story.webp \\
+        "http://localhost:8000/resize?preset=Instagram/Stories&method=crop&format=webp"
+
+Rotas:
+
+- ``POST /resize``: corpo com os bytes da imagem; parâmetros ``preset``
+  (``Rede/Tipo``) ou ``width``/``height``, ``method``, ``format``
+  (``keep``/``jpeg``/``png``/``webp``), ``quality``, ``max_size`` (KB),
+  ``anchor`` e ``fast=1``;
+- ``POST /convert``: só converte o formato (``format``, ``quality``, ``max_size``);
+- ``GET /presets``, ``GET /health`` e ``GET /metrics`` (Prometheus).
+
+O servidor atende conexões em threads (com keep-alive) e envia o trabalho
+pesado para um pool de processos criado na partida, antes de qualquer
+thread, com o Pillow e o motor já importados. Pedidos acima do limite de
+tamanho recebem 413; com todos os processos ocupados e a fila cheia, 503
+com ``Retry-After``.
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Pool, TimeoutError as PoolTimeoutError
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from PIL import Image
+
+from animation import encode_animation, is_animated
+from image_engine import (
+    ANCHOR_CENTER,
+    ANIMATED_FORMATS,
+    BACKEND_PILLOW,
+    CONVERTER_OUTPUT_FORMATS,
+    METHOD_CROP,
+    QUALITY_EXACT,
+    QUALITY_FAST,
+    QUALITY_FORMATS,
+    RESIZER_OUTPUT_FORMATS,
+    SOCIAL_MEDIA_PRESETS,
+    ImageBudgetError,
+    ResizeSpec,
+    convert_image_bytes,
+    decode_image,
+    encode_image,
+    encode_to_size,
+    parse_preset_name,
+    resolve_save_format,
+)
+from instrumentation import Trace, prometheus_text
+from probe import check_input_budget, probe_image
+from tiled_resize import resize_bounded
+
+DEFAULT_PORT = int(os.environ.get("REDIMENSIONADOR_API_PORT", "8000"))
+
+# Maior corpo de requisição aceito (MB)
+DEFAULT_MAX_REQUEST_MB = int(os.environ.get("REDIMENSIONADOR_API_MAX_REQUEST_MB", "32"))
+
+# Pedidos esperando por processo ocupado antes de responder 503
+DEFAULT_QUEUE_PER_WORKER = 2
+
+# Tempo máximo de processamento de um pedido (segundos)
+DEFAULT_REQUEST_TIMEOUT = 60.0
+
+# Sugestão de espera enviada com o 503 (segundos)
+RETRY_AFTER_SECONDS = 1
+
+
+class RequestError(Exception):
+    """Erro do pedido, com o status HTTP da resposta."""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _param(params: Dict[str, List[str]], name: str, default: Optional[str] = None) -> Optional[str]:
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _int_param(params: Dict[str, List[str]], name: str, default: int) -> int:
+    value = _param(params, name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"Parâmetro {name} deve ser inteiro: {value}") from None
+
+
+def spec_from_params(params: Dict[str, List[str]]) -> ResizeSpec:
+    """Monta o :class:`ResizeSpec` a partir dos parâmetros da URL."""
+    preset = _param(params, "preset")
+    if preset:
+        try:
+            social, name = parse_preset_name(preset)
+        except KeyError as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, e.args[0]) from None
+        width, height = SOCIAL_MEDIA_PRESETS[social][name]
+    elif "width" in params and "height" in params:
+        width, height = _int_param(params, "width", 0), _int_param(params, "height", 0)
+    else:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Informe preset=Rede/Tipo ou width e height")
+
+    try:
+        return ResizeSpec(
+            width,
+            height,
+            method=_param(params, "method", METHOD_CROP),
+            quality=QUALITY_FAST if _param(params, "fast") in ("1", "true") else QUALITY_EXACT,
+            backend=BACKEND_PILLOW,
+            anchor=_param(params, "anchor", ANCHOR_CENTER),
+        )
+    except ValueError as e:
+        raise RequestError(HTTPStatus.BAD_REQUEST, str(e)) from None
+
+
+def _warm_up() -> None:
+    # Importações e plugins carregados na partida de cada processo, não no primeiro pedido
+    Image.init()
+    encode_image(Image.new("RGB", (8, 8)), "JPEG")
+
+
+def resize_request(data: bytes, spec: ResizeSpec, output_format: str, quality: int, max_bytes: int) -> Tuple[bytes, str]:
+    """Executado nos processos do pool: redimensiona e codifica, retornando ``(bytes, formato)``."""
+    with Image.open(io.BytesIO(data)) as header:
+        animated = is_animated(header)
+        save_format = resolve_save_format(output_format, header.format, animated)
+    if animated and save_format in ANIMATED_FORMATS:
+        return encode_animation(data, spec, save_format, quality=quality), save_format
+
+    resized = resize_bounded(decode_image(data, spec), spec)
+    if max_bytes and save_format in QUALITY_FORMATS:
+        return encode_to_size(resized, save_format, max_bytes)[0], save_format
+    return encode_image(resized, save_format, quality=quality), save_format
+
+
+def convert_request(data: bytes, output_format: str, quality: int, max_bytes: int) -> Tuple[bytes, str]:
+    """Executado nos processos do pool: só converte o formato."""
+    return convert_image_bytes(data, output_format, quality, max_bytes), output_format
+
+
+class ResizeServer(ThreadingHTTPServer):
+    """Servidor com o pool de processos e o controle de fila compartilhados pelas conexões."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        workers: int,
+        max_request_bytes: int,
+        max_pending: int,
+        request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        quiet: bool = False,
+    ):
+        # O pool é criado antes de o servidor abrir threads, então o fork copia um processo "limpo"
+        self.pool = Pool(processes=workers, initializer=_warm_up)
+        self.workers = workers
+        self.max_request_bytes = max_request_bytes
+        self.max_pending = max_pending
+        self.request_timeout = request_timeout
+        self.quiet = quiet
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        super().__init__(address, ResizeHandler)
+
+    def run(self, func, *args):
+        """Executa ``func`` no pool, ou levanta 503 se não há vaga na fila.
+
+        A vaga só é devolvida quando o pool termina a tarefa: depois de um 504
+        o processo continua ocupado com ela, e a fila não pode aceitar outra
+        no lugar.
+        """
+        if not self.slots.acquire(blocking=False):
+            raise RequestError(HTTPStatus.SERVICE_UNAVAILABLE, "Servidor ocupado, tente novamente")
+        with self._in_flight_lock:
+            self._in_flight += 1
+        try:
+            pending = self.pool.apply_async(func, args, callback=self._finished, error_callback=self._finished)
+        except BaseException:
+            self._finished(None)
+            raise
+        try:
+            return pending.get(timeout=self.request_timeout)
+        except PoolTimeoutError:
+            raise RequestError(HTTPStatus.GATEWAY_TIMEOUT, "Tempo de processamento esgotado") from None
+
+    def _finished(self, _) -> None:
+        # Chamado pela thread de resultados do pool, com sucesso ou erro
+        with self._in_flight_lock:
+            self._in_flight -= 1
+        self.slots.release()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def server_close(self):
+        super().server_close()
+        self.pool.terminate()
+        self.pool.join()
+
+
+class ResizeHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 mantém a conexão aberta entre pedidos do mesmo cliente
+    protocol_version = "HTTP/1.1"
+    server_version = "Redimensionador"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send(self, status: HTTPStatus, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: HTTPStatus, payload, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send(status, body, "application/json; charset=utf-8", headers)
+
+    def _read_body(self) -> bytes:
+        length = self.headers.get("Content-Length")
+        if length is None:
+            raise RequestError(HTTPStatus.LENGTH_REQUIRED, "Content-Length obrigatório")
+        try:
+            length = int(length)
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Content-Length inválido") from None
+        if length > self.server.max_request_bytes:
+            # O corpo não é lido; a conexão é fechada para não ficar com bytes pendentes
+            self.close_connection = True
+            raise RequestError(
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                f"Arquivo acima do limite de {self.server.max_request_bytes // (1024 * 1024)} MB"
+            )
+        if length == 0:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Envie os bytes da imagem no corpo do pedido")
+        return self.rfile.read(length)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/health":
+            self._send_json(HTTPStatus.OK, {
+                "status": "ok",
+                "workers": self.server.workers,
+                "in_flight": self.server.in_flight,
+                "max_pending": self.server.max_pending,
+            })
+        elif path == "/presets":
+            presets = {social: {name: list(size) for name, size in items.items()} for social, items in SOCIAL_MEDIA_PRESETS.items()}
+            self._send_json(HTTPStatus.OK, presets)
+        elif path == "/metrics":
+            self._send(HTTPStatus.OK, prometheus_text().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Rota não encontrada"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        trace = Trace(label=url.path, enabled=True)
+        try:
+            if url.path not in ("/resize", "/convert"):
+                # O corpo não será lido; fechar a conexão evita interpretá-lo como o próximo pedido
+                self.close_connection = True
+                raise RequestError(HTTPStatus.NOT_FOUND, "Rota não encontrada")
+            data = self._read_body()
+            # Só o cabeçalho, nesta thread: imagens acima do limite nem chegam a ocupar o pool
+            with trace.stage("probe"):
+                check_input_budget(probe_image(data))
+
+            if url.path == "/resize":
+                spec = spec_from_params(params)
+                output_format = (_param(params, "format", "keep") or "keep").upper()
+                if output_format != "KEEP" and output_format not in RESIZER_OUTPUT_FORMATS:
+                    raise RequestError(HTTPStatus.BAD_REQUEST, f"Formato de saída inválido: {output_format}")
+                args = (spec, output_format, _int_param(params, "quality", 95), _int_param(params, "max_size", 0) * 1024)
+                func, stage_name = resize_request, "http_resize"
+            else:
+                output_format = (_param(params, "format", "webp") or "webp").upper()
+                if output_format not in CONVERTER_OUTPUT_FORMATS:
+                    raise RequestError(HTTPStatus.BAD_REQUEST, f"Formato de saída inválido: {output_format}")
+                args = (output_format, _int_param(params, "quality", 90), _int_param(params, "max_size", 0) * 1024)
+                func, stage_name = convert_request, "http_convert"
+
+            with trace.stage(stage_name) as stage:
+                encoded, save_format = self.server.run(func, data, *args)
+                stage.nbytes = len(encoded)
+        except RequestError as e:
+            headers = {"Retry-After": str(RETRY_AFTER_SECONDS)} if e.status == HTTPStatus.SERVICE_UNAVAILABLE else None
+            self._send_json(e.status, {"error": str(e)}, headers)
+            return
+        except (ImageBudgetError, Image.DecompressionBombError) as e:
+            self._send_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": str(e)})
+            return
+        except (ValueError, OSError) as e:
+            # Inclui arquivos que o Pillow não reconhece (UnidentifiedImageError)
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)})
+            return
+
+        self._send(HTTPStatus.OK, encoded, f"image/{save_format.lower()}", {
+            "X-Processing-Ms": f"{trace.total_seconds * 1000:.1f}",
+        })
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="API HTTP local de redimensionamento.")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço de escuta")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Porta")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Processos do pool")
+    parser.add_argument(
+        "--max-pending", type=int, default=None,
+        help="Pedidos aceitos ao mesmo tempo (em processamento + na fila) antes de responder 503"
+    )
+    parser.add_argument("--max-request-mb", type=int, default=DEFAULT_MAX_REQUEST_MB, help="Maior corpo aceito (MB)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_REQUEST_TIMEOUT, help="Tempo máximo por pedido (s)")
+    parser.add_argument("--quiet", action="store_true", help="Não registra cada pedido no stderr")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    workers = max(1, args.workers)
+    max_pending = args.max_pending or workers * (1 + DEFAULT_QUEUE_PER_WORKER)
+    server = ResizeServer(
+        (args.host, args.port), workers, args.max_request_mb * 1024 * 1024, max_pending, args.timeout, args.quiet
+    )
+    print(
+        f"Servindo em http://{args.host}:{server.server_address[1]} com {workers} processo(s), "
+        f"até {max_pending} pedidos simultâneos",
+        file=sys.stderr,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,73 @@
+import time
+import uuid
+
 import streamlit as st
-from PIL import Image
-import io
+from dataclasses import astuple
+
+from image_engine import (
+    ANIMATED_FORMATS,
+    BACKEND_NUMPY,
+    BACKEND_PILLOW,
+    CONVERTER_OUTPUT_FORMATS,
+    SOCIAL_MEDIA_PRESETS,
+    METHOD_LABELS,
+    QUALITY_LABELS,
+    QUALITY_FORMATS,
+    ResizeSpec,
+    check_output_budget,
+    compose_from_intermediate,
+    convert_image_bytes,
+    converted_file_name,
+    crop_geometry,
+    decode_image,
+    decode_proxy,
+    encode_image,
+    encode_to_size,
+    equivalent_percent,
+    estimate_encoded_size,
+    estimate_output_size,
+    format_file_size,
+    intermediate_size,
+    iter_render_presets,
+    preset_file_name,
+    ratios_differ,
+    render_preview,
+    resolve_save_format,
+    safe_name,
+    scale_intermediate,
+)
+from image_cache import content_hash, estimate_nbytes, get_default_cache
+from disk_cache import get_default_disk_cache, make_key
+from archive import ARCHIVE_MIME_TYPES, ArchiveStore, ArchiveTooLargeError
+from numpy_resample import NUMPY_AVAILABLE
+from tiled_resize import needs_strips, resize_in_strips
+from smart_crop import smart_crop_offsets
+from animation import encode_animation
+from probe import check_input_budget, plan_decode, probe_image
+from instrumentation import ENABLED_BY_DEFAULT, Trace, prometheus_text
+from jobs import (
+    JOB_CANCELLED,
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_PENDING,
+    JOB_RUNNING,
+    convert_job,
+    get_default_job_queue,
+    render_job,
+)
+from batch_convert import throughput_summary, unique_name
+
+# Cache compartilhado entre as execuções do script
+image_cache = get_default_cache()
+
+# Cache em disco compartilhado entre sessões e processos (None se desativado)
+disk_cache = get_default_disk_cache()
+
+# Fila de trabalhos pesados em outros processos, compartilhada pelo servidor (None se desativada)
+job_queue = get_default_job_queue()
+
+# Intervalo entre as atualizações do progresso enquanto há trabalhos desta sessão em andamento
+JOB_POLL_SECONDS = 0.5
 
 st.set_page_config(
     page_title="Redimensionador de Imagens",
@@ -8,61 +75,110 @@ st.set_page_config(
     layout="wide"
 )
 
-# Dicionário com dimensões das redes sociais
-SOCIAL_MEDIA_PRESETS = {
-    "Instagram": {
-        "Feed (Post Quadrado)": (1080, 1080),
-        "Feed (Post Retrato)": (1080, 1350),
-        "Feed (Post Paisagem)": (1080, 566),
-        "Stories": (1080, 1920),
-        "Reels": (1080, 1920),
-        "IGTV/Cover": (1080, 1920),
-        "Perfil": (320, 320)
-    },
-    "Facebook": {
-        "Post no Feed": (1200, 630),
-        "Post Quadrado": (1200, 1200),
-        "Capa": (1640, 859),
-        "Perfil": (400, 400),
-        "Stories": (1080, 1920),
-        "Evento": (1920, 1080)
-    },
-    "Twitter/X": {
-        "Post com Imagem": (1200, 675),
-        "Post Quadrado": (1200, 1200),
-        "Header": (1500, 500),
-        "Perfil": (400, 400)
-    },
-    "LinkedIn": {
-        "Post no Feed": (1200, 627),
-        "Post Quadrado": (1200, 1200),
-        "Capa": (1584, 396),
-        "Perfil": (400, 400),
-        "Banner de Empresa": (1128, 191)
-    },
-    "TikTok": {
-        "Vídeo/Post": (1080, 1920),
-        "Perfil": (200, 200)
-    },
-    "YouTube": {
-        "Thumbnail": (1280, 720),
-        "Banner": (2560, 1440),
-        "Perfil": (800, 800)
-    },
-    "Pinterest": {
-        "Pin Padrão": (1000, 1500),
-        "Pin Quadrado": (1000, 1000),
-        "Pin Longo": (1000, 2100)
-    },
-    "WhatsApp": {
-        "Status": (1080, 1920),
-        "Perfil": (640, 640)
-    }
-}
-
 st.title("🖼️ Redimensionador de Imagens")
 st.markdown("Redimensione suas imagens usando presets de redes sociais, por porcentagem ou definindo dimensões personalizadas")
 
+# Identifica a sessão nas chaves dos trabalhos em segundo plano
+if "job_session" not in st.session_state:
+    st.session_state["job_session"] = uuid.uuid4().hex
+
+# Arquivos ZIP prontos desta sessão, gerados uma vez por pedido e limitados em bytes
+if "archives" not in st.session_state:
+    st.session_state["archives"] = ArchiveStore()
+archives = st.session_state["archives"]
+
+# Trabalhos desta sessão ainda em andamento nesta execução do script
+active_jobs = []
+
+
+def submit_job(slot, request_key, func, *args):
+    # Um novo trabalho no mesmo slot substitui (e cancela) o anterior desta sessão
+    job_id = job_queue.submit(func, *args, key=(st.session_state["job_session"], slot))
+    st.session_state[slot] = (request_key, job_id)
+
+
+def poll_job(slot, request_key, trace=None):
+    """Resultado do trabalho em ``slot`` se já terminou; senão mostra o progresso e retorna None.
+
+    Se os parâmetros mudaram desde o envio (ex.: novo valor de um slider), o
+    trabalho antigo é cancelado em vez de terminar e ser descartado. As etapas
+    medidas no processo do trabalho entram em ``trace``.
+    """
+    if slot not in st.session_state:
+        return None
+    job_key, job_id = st.session_state[slot]
+    if job_key != request_key:
+        job_queue.cancel(job_id)
+        del st.session_state[slot]
+        return None
+    
+    status = job_queue.status(job_id)
+    if status.state == JOB_DONE:
+        del st.session_state[slot]
+        return job_queue.result(job_id, trace)
+    if status.state in (JOB_FAILED, JOB_CANCELLED):
+        del st.session_state[slot]
+        job_queue.forget(job_id)
+        if status.state == JOB_FAILED:
+            st.error(f"Erro ao processar: {status.message}")
+        return None
+    
+    st.progress(status.progress, text=f"Processando em segundo plano... {status.message or 'na fila'}")
+    if st.button("✖️ Cancelar", key=f"cancel_{slot}"):
+        job_queue.cancel(job_id)
+        del st.session_state[slot]
+        st.rerun()
+    active_jobs.append(slot)
+    return None
+
+
+def submit_job_group(slot, request_key, func, named_args):
+    # Um trabalho por item; todos são cancelados juntos se o pedido mudar
+    session = st.session_state["job_session"]
+    jobs = [
+        (name, job_queue.submit(func, *args, key=(session, slot, index)))
+        for index, (name, args) in enumerate(named_args)
+    ]
+    st.session_state[slot] = (request_key, jobs, time.perf_counter())
+
+
+def poll_job_group(slot, request_key):
+    """Como :func:`poll_job`, para um grupo de trabalhos.
+
+    Quando todos terminam, retorna ``(((nome, bytes ou None, erro ou None), ...), segundos)``.
+    """
+    if slot not in st.session_state:
+        return None
+    job_key, jobs, started = st.session_state[slot]
+    if job_key != request_key:
+        for _, job_id in jobs:
+            job_queue.cancel(job_id)
+        del st.session_state[slot]
+        return None
+    
+    statuses = [(name, job_id, job_queue.status(job_id)) for name, job_id in jobs]
+    finished = sum(1 for _, _, status in statuses if status.state not in (JOB_PENDING, JOB_RUNNING))
+    if finished < len(jobs):
+        st.progress(finished / len(jobs), text=f"Processando em segundo plano... {finished}/{len(jobs)}")
+        if st.button("✖️ Cancelar", key=f"cancel_{slot}"):
+            for _, job_id in jobs:
+                job_queue.cancel(job_id)
+            del st.session_state[slot]
+            st.rerun()
+        active_jobs.append(slot)
+        return None
+    
+    outcomes = []
+    for name, job_id, status in statuses:
+        if status.state == JOB_DONE:
+            outcomes.append((name, job_queue.result(job_id), None))
+        else:
+            job_queue.forget(job_id)
+            outcomes.append((name, None, status.message or "cancelado"))
+    del st.session_state[slot]
+    return tuple(outcomes), time.perf_counter() - started
+
+
 # Menu lateral
 st.sidebar.title("⚙️ Configurações")
 
@@ -73,19 +189,72 @@ uploaded_file = st.sidebar.file_uploader(
     help="Formatos suportados: PNG, JPG, JPEG, GIF, BMP, WEBP"
 )
 
+# Medição de tempo e memória por etapa (menu lateral)
+show_performance = st.sidebar.checkbox(
+    "📊 Mostrar desempenho",
+    value=ENABLED_BY_DEFAULT,
+    help="Mede o tempo e a memória de cada etapa do processamento desta imagem."
+)
+
 if uploaded_file is not None:
+    trace = Trace(label=uploaded_file.name, enabled=show_performance)
+    
+    def measured(stage_name, compute):
+        # Executa uma etapa medindo tempo e bytes gerados
+        with trace.stage(stage_name) as stage:
+            result = compute()
+            stage.nbytes = estimate_nbytes(result)
+        return result
+    
     # Carregar imagem
     try:
-        image = Image.open(uploaded_file)
-        original_format = image.format or 'PNG'
+        upload_hash = content_hash(uploaded_file.getvalue())
+        # Só o cabeçalho: dimensões e limites são conhecidos antes de decodificar os pixels
+        probe = image_cache.get_or_compute(
+            (upload_hash, "probe"),
+            lambda: measured("probe", lambda: probe_image(uploaded_file.getvalue()))
+        )
+        check_input_budget(probe)
+        original_format = probe.format or 'PNG'
+        animated = probe.animated
+        
+        def original_key(spec=None):
+            return (upload_hash, "original", plan_decode(probe, spec).draft_scale)
+        
+        def load_original(spec=None):
+            # A resolução total só é decodificada quando o download ou o ZIP precisam dela,
+            # já reduzida (JPEG no modo rápido) quando o plano permite
+            key = original_key(spec)
+            return image_cache.get_or_compute(
+                key,
+                lambda: measured("decode", lambda: decode_image(
+                    uploaded_file.getvalue(), spec if key[2] > 1 else None
+                ))
+            )
         
         # Mostrar informações da imagem original
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("📷 Imagem Original")
-            st.image(image, caption=f"Tamanho original: {image.width} x {image.height} pixels", use_container_width=True)
-            st.info(f"**Formato:** {original_format}\n\n**Dimensões:** {image.width} x {image.height} pixels")
+            info_lines = [
+                f"**Formato:** {original_format}",
+                f"**Dimensões:** {probe.width} x {probe.height} pixels ({probe.megapixels:.1f} MP, {probe.mode})",
+                f"**Arquivo:** {format_file_size(probe.file_bytes)}",
+            ]
+            if animated:
+                info_lines.append(f"**Animação:** {probe.frames} quadros")
+            if probe.orientation != 1:
+                info_lines.append(f"**Orientação EXIF:** {probe.orientation}")
+            if probe.icc_bytes:
+                info_lines.append(f"**Perfil ICC:** {format_file_size(probe.icc_bytes)}")
+            st.info("\n\n".join(info_lines))
+            # A prévia usa uma cópia reduzida para não enviar a imagem inteira ao navegador
+            proxy_image = image_cache.get_or_compute(
+                (upload_hash, "proxy"),
+                lambda: measured("proxy", lambda: decode_proxy(uploaded_file.getvalue()))
+            )
+            st.image(proxy_image, caption=f"Tamanho original: {probe.width} x {probe.height} pixels", use_container_width=True)
         
         # Controles de redimensionamento (menu lateral)
         st.sidebar.subheader("⚙️ Configurações de Redimensionamento")
@@ -97,8 +266,8 @@ if uploaded_file is not None:
             help="Presets: dimensões prontas para redes sociais. Por Porcentagem: mantém a proporção. Dimensões Manuais: defina largura e altura específicas."
         )
         
-        new_width = image.width
-        new_height = image.height
+        new_width = probe.width
+        new_height = probe.height
         percent = 100
         selected_social = None
         selected_preset = None
@@ -128,12 +297,7 @@ if uploaded_file is not None:
                     new_height = preset_height
                     
                     # Calcular porcentagem equivalente
-                    if new_width != image.width:
-                        percent = int((new_width / image.width) * 100)
-                    elif new_height != image.height:
-                        percent = int((new_height / image.height) * 100)
-                    else:
-                        percent = 100
+                    percent = equivalent_percent(probe.size, (new_width, new_height))
                     
                     # Mostrar informações do preset (lateral)
                     st.sidebar.info(f"📏 **Dimensões para {selected_social} - {selected_preset}:** {preset_width} x {preset_height} pixels")
@@ -172,13 +336,13 @@ if uploaded_file is not None:
             )
             
             # Cálculo do novo tamanho exibido ao lado da imagem
-            new_width = int(image.width * percent / 100)
-            new_height = int(image.height * percent / 100)
+            new_width = int(probe.width * percent / 100)
+            new_height = int(probe.height * percent / 100)
             st.metric("Novo tamanho", f"{new_width} x {new_height} pixels")
         else:
             # Modo manual (menu lateral)
             st.sidebar.markdown("**Dimensões Originais:**")
-            st.sidebar.info(f"Largura: {image.width}px\n\nAltura: {image.height}px")
+            st.sidebar.info(f"Largura: {probe.width}px\n\nAltura: {probe.height}px")
             
             maintain_ratio = st.sidebar.checkbox(
                 "Manter proporção",
@@ -190,14 +354,14 @@ if uploaded_file is not None:
                 "Largura (pixels)",
                 min_value=1,
                 max_value=10000,
-                value=image.width,
+                value=probe.width,
                 step=1,
                 help="Digite a largura desejada em pixels"
             )
             
             if maintain_ratio:
                 # Calcular altura proporcional
-                ratio = image.height / image.width
+                ratio = probe.height / probe.width
                 calculated_height = int(manual_width * ratio)
                 st.sidebar.markdown("**Altura (pixels):**")
                 st.sidebar.info(f"{calculated_height}px\n\n*Calculada automaticamente para manter a proporção*")
@@ -207,7 +371,7 @@ if uploaded_file is not None:
                     "Altura (pixels)",
                     min_value=1,
                     max_value=10000,
-                    value=image.height,
+                    value=probe.height,
                     step=1,
                     help="Digite a altura desejada em pixels"
                 )
@@ -216,24 +380,14 @@ if uploaded_file is not None:
             new_height = int(manual_height)
             
             # Calcular porcentagem equivalente para exibição
-            if new_width != image.width:
-                percent = int((new_width / image.width) * 100)
-            elif new_height != image.height:
-                percent = int((new_height / image.height) * 100)
-            else:
-                percent = 100
+            percent = equivalent_percent(probe.size, (new_width, new_height))
         
         # Método de redimensionamento (apenas se as dimensões forem diferentes)
         resize_method = "Distorcer"  # Padrão
-        resized_image = None
         
-        if new_width != image.width or new_height != image.height:
-            # Calcular proporções
-            original_ratio = image.width / image.height
-            target_ratio = new_width / new_height
-            
+        if new_width != probe.width or new_height != probe.height:
             # Se as proporções forem diferentes, oferecer opções
-            if abs(original_ratio - target_ratio) > 0.01:  # Tolerância para diferenças pequenas
+            if ratios_differ(probe.size, (new_width, new_height)):
                 resize_method = st.radio(
                     "⚠️ As proporções são diferentes. Como deseja redimensionar?",
                     ["Distorcer", "Cortar (Crop)", "Adicionar barras (Padding)"],
@@ -244,34 +398,34 @@ if uploaded_file is not None:
                 # Proporções iguais, apenas redimensionar normalmente
                 resize_method = "Distorcer"
             
+            crop_left = None
+            crop_top = None
+            
             # Aplicar método de redimensionamento
-            if resize_method == "Distorcer":
-                resized_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            elif resize_method == "Cortar (Crop)":
+            if resize_method == "Cortar (Crop)":
                 st.markdown("**✂️ Ajuste a área de corte:**")
                 st.info("Use os controles para escolher qual parte da imagem será mantida no corte.")
                 
-                # Calcular escala para manter proporção e preencher o tamanho alvo
-                scale = max(new_width / image.width, new_height / image.height)
-                scaled_width = int(image.width * scale)
-                scaled_height = int(image.height * scale)
-                
-                # Redimensionar mantendo proporção
-                temp_image = image.resize((scaled_width, scaled_height), Image.Resampling.LANCZOS)
-                
                 # Calcular limites de movimento
-                max_offset_x = max(0, scaled_width - new_width)
-                max_offset_y = max(0, scaled_height - new_height)
+                scaled_width, scaled_height, max_offset_x, max_offset_y = crop_geometry(
+                    probe.size, (new_width, new_height)
+                )
                 
                 # Chaves para estado da sessão
                 crop_key_x = f"crop_offset_x_{new_width}_{new_height}"
                 crop_key_y = f"crop_offset_y_{new_width}_{new_height}"
                 
-                # Inicializar valores
+                # Inicializar valores com o corte automático (mapa de bordas do proxy)
+                auto_offsets = image_cache.get_or_compute(
+                    (upload_hash, "smart_crop", new_width, new_height),
+                    lambda: measured("smart_crop", lambda: smart_crop_offsets(
+                        proxy_image, (scaled_width, scaled_height), (new_width, new_height)
+                    ))
+                )
                 if crop_key_x not in st.session_state:
-                    st.session_state[crop_key_x] = max_offset_x // 2 if max_offset_x > 0 else 0
+                    st.session_state[crop_key_x] = auto_offsets[0]
                 if crop_key_y not in st.session_state:
-                    st.session_state[crop_key_y] = max_offset_y // 2 if max_offset_y > 0 else 0
+                    st.session_state[crop_key_y] = auto_offsets[1]
                 
                 # Garantir limites
                 st.session_state[crop_key_x] = min(st.session_state[crop_key_x], max_offset_x)
@@ -311,48 +465,82 @@ if uploaded_file is not None:
                         else:
                             crop_offset_y = 0
                     
-                    if st.button("🎯 Centralizar corte", key=f"center_{new_width}_{new_height}"):
-                        st.session_state[crop_key_x] = max_offset_x // 2 if max_offset_x > 0 else 0
-                        st.session_state[crop_key_y] = max_offset_y // 2 if max_offset_y > 0 else 0
-                        st.rerun()
+                    col_center, col_auto = st.columns(2)
+                    with col_center:
+                        if st.button("🎯 Centralizar corte", key=f"center_{new_width}_{new_height}"):
+                            st.session_state[crop_key_x] = max_offset_x // 2 if max_offset_x > 0 else 0
+                            st.session_state[crop_key_y] = max_offset_y // 2 if max_offset_y > 0 else 0
+                            st.rerun()
+                    with col_auto:
+                        if st.button("✨ Corte automático", key=f"auto_{new_width}_{new_height}",
+                                     help="Posiciona o corte na região com mais detalhes da imagem"):
+                            st.session_state[crop_key_x] = auto_offsets[0]
+                            st.session_state[crop_key_y] = auto_offsets[1]
+                            st.rerun()
                     
-                    left = st.session_state[crop_key_x]
-                    top = st.session_state[crop_key_y]
-                else:
-                    # Sem espaço para mover, cortar centralizado
-                    left = (scaled_width - new_width) // 2
-                    top = (scaled_height - new_height) // 2
-                
-                right = left + new_width
-                bottom = top + new_height
-                resized_image = temp_image.crop((left, top, right, bottom))
-            else:  # Padding
-                # Calcular escala para manter proporção e caber no tamanho alvo
-                scale = min(new_width / image.width, new_height / image.height)
-                scaled_width = int(image.width * scale)
-                scaled_height = int(image.height * scale)
-                
-                # Redimensionar mantendo proporção
-                temp_image = image.resize((scaled_width, scaled_height), Image.Resampling.LANCZOS)
-                
-                # Converter para RGBA se necessário para suportar transparência
-                if temp_image.mode != 'RGBA':
-                    temp_image = temp_image.convert('RGBA')
-                
-                # Criar imagem com fundo transparente
-                resized_image = Image.new('RGBA', (new_width, new_height), (255, 255, 255, 0))
-                
-                # Centralizar a imagem redimensionada
-                paste_x = (new_width - scaled_width) // 2
-                paste_y = (new_height - scaled_height) // 2
+                    crop_left = st.session_state[crop_key_x]
+                    crop_top = st.session_state[crop_key_y]
+            
+            # Qualidade do redimensionamento (menu lateral)
+            resize_quality = st.sidebar.radio(
+                "Qualidade do redimensionamento",
+                list(QUALITY_LABELS.keys()),
+                horizontal=True,
+                help="Exata: LANCZOS na resolução total. Rápida: reduz primeiro por fatores inteiros, muito mais rápido para grandes reduções."
+            )
+            
+            # Backend NumPy multi-thread, disponível só com o numpy instalado
+            resize_backend = BACKEND_PILLOW
+            if NUMPY_AVAILABLE:
+                resize_backend = st.sidebar.selectbox(
+                    "Motor de reamostragem",
+                    [BACKEND_PILLOW, BACKEND_NUMPY],
+                    format_func=lambda backend: "Pillow" if backend == BACKEND_PILLOW else "NumPy (todos os núcleos)",
+                    help="NumPy divide uma imagem grande entre todos os núcleos do processador."
+                )
+            
+            # Sem deslocamento definido, o motor centraliza o corte
+            resize_spec = ResizeSpec(
+                new_width,
+                new_height,
+                method=METHOD_LABELS[resize_method],
+                offset_x=crop_left,
+                offset_y=crop_top,
+                quality=QUALITY_LABELS[resize_quality],
+                backend=resize_backend,
+            )
+            
+            # Recusar pedidos acima do limite de pixels antes de qualquer processamento
+            check_output_budget(resize_spec)
+            
+            # Prévia renderizada a partir do proxy; a resolução total só é usada no download
+            preview_image = measured("preview", lambda: render_preview(proxy_image, resize_spec))
+            
+            def render_full_resolution():
+                image = load_original(resize_spec)
+                # Saídas muito grandes são geradas em faixas, sem cópias intermediárias inteiras
+                if needs_strips(image, resize_spec):
+                    return measured("resize_strips", lambda: resize_in_strips(image, resize_spec))
                 
-                # Colar a imagem mantendo transparência
-                resized_image.paste(temp_image, (paste_x, paste_y), temp_image)
+                # A imagem escalada só depende do tamanho, do método, da qualidade e do backend;
+                # mudar o corte reaproveita o cache
+                temp_image = image_cache.get_or_compute(
+                    (
+                        upload_hash, intermediate_size(image.size, resize_spec),
+                        resize_spec.method, resize_spec.quality, resize_spec.backend,
+                    ),
+                    lambda: measured("resize", lambda: scale_intermediate(image, resize_spec))
+                )
+                # Inclui a conversão para RGBA e a colagem do padding
+                return measured("compose", lambda: compose_from_intermediate(temp_image, resize_spec))
             
             # Mostrar resultado
             with col2:
                 st.subheader("✨ Imagem Redimensionada")
-                st.image(resized_image, caption=f"Tamanho redimensionado: {new_width} x {new_height} pixels", use_container_width=True)
+                with trace.stage("st.image") as stage:
+                    st.image(preview_image, caption=f"Tamanho redimensionado: {new_width} x {new_height} pixels (prévia)", use_container_width=True)
+                    stage.nbytes = estimate_nbytes(preview_image)
+                st.caption(f"Resolução total: {plan_decode(probe, resize_spec).describe()}")
                 
                 # Mensagem com método usado
                 method_text = ""
@@ -365,9 +553,6 @@ if uploaded_file is not None:
                 
                 st.success(f"**Dimensões:** {new_width} x {new_height} pixels\n\n**Redimensionamento:** {percent}%{method_text}")
             
-            # Preparar imagem para download
-            img_buffer = io.BytesIO()
-            
             # Escolha do formato de saída no menu lateral
             output_format_option = st.sidebar.selectbox(
                 "Formato de saída",
@@ -376,37 +561,115 @@ if uploaded_file is not None:
             )
             
             # Definir formato a ser usado
-            if output_format_option == "Manter formato original":
-                # Manter o formato original, com fallback para PNG
-                save_format = original_format if original_format in ["JPEG", "PNG", "WEBP"] else "PNG"
-            else:
-                save_format = output_format_option
+            save_format = resolve_save_format(output_format_option, original_format, animated)
+            # Animações são mantidas em GIF/WEBP; nos demais formatos só o primeiro quadro é usado
+            keep_animation = animated and save_format in ANIMATED_FORMATS
+            if animated and not keep_animation:
+                st.sidebar.warning(f"{save_format} não suporta animação: apenas o primeiro quadro será salvo.")
+            if keep_animation:
+                # O codificador guarda todos os quadros de saída: o limite vale para a soma deles
+                check_output_budget(resize_spec, frames=probe.frames)
             
-            # Ajustar modo da imagem para formatos que não suportam transparência (ex.: JPEG)
-            if save_format == "JPEG" and resized_image.mode in ["RGBA", "LA", "P"]:
-                resized_image = resized_image.convert("RGB")
-            
-            resized_image.save(img_buffer, format=save_format, quality=95)
-            img_buffer.seek(0)
+            # Limite de tamanho do arquivo (ex.: restrições de upload); 0 mantém a qualidade fixa em 95
+            max_file_kb = 0
+            if save_format in QUALITY_FORMATS and not keep_animation:
+                max_file_kb = int(st.sidebar.number_input(
+                    "Tamanho máximo do arquivo (KB)",
+                    min_value=0,
+                    value=0,
+                    step=50,
+                    help="0 = sem limite. Com um limite, usa a maior qualidade JPEG/WEBP cujo arquivo cabe nele."
+                ))
+            max_file_bytes = max_file_kb * 1024
+            # Com limite, a qualidade é escolhida pela busca; a chave registra o limite no lugar dela
+            quality_key = ("max_bytes", max_file_bytes) if max_file_bytes else 95
             
             # Botão de download
             st.subheader("💾 Download")
             if resize_mode == "Presets de Redes Sociais" and selected_social and selected_preset:
-                safe_social = selected_social.lower().replace("/", "_").replace(" ", "_")
-                safe_preset = selected_preset.lower().replace("/", "_").replace(" ", "_")
-                file_name = f"{safe_social}_{safe_preset}_{new_width}x{new_height}.{save_format.lower()}"
+                file_name = preset_file_name(selected_social, selected_preset, (new_width, new_height), save_format)
             elif resize_mode == "Por Porcentagem":
                 file_name = f"redimensionada_{percent}porcento.{save_format.lower()}"
             else:
                 file_name = f"redimensionada_{new_width}x{new_height}.{save_format.lower()}"
             
-            st.download_button(
-                label=f"⬇️ Baixar imagem redimensionada ({new_width}x{new_height})",
-                data=img_buffer,
-                file_name=file_name,
-                mime=f"image/{save_format.lower()}",
-                type="primary"
+            # A codificação só acontece quando o download é pedido e fica em cache
+            encode_key = (upload_hash, resize_spec, save_format, quality_key, keep_animation)
+            # Estima a partir da original se ela já foi decodificada (download ou ZIP); senão, do proxy
+            # da prévia, sem decodificar a resolução total só para mostrar um número
+            estimate_source = image_cache.get(original_key(resize_spec))
+            estimate_kind = "original" if estimate_source is not None else "proxy"
+            estimated_size = image_cache.get_or_compute(
+                ("estimate", estimate_kind) + encode_key,
+                lambda: measured("estimate", lambda: estimate_output_size(
+                    estimate_source if estimate_source is not None else proxy_image,
+                    resize_spec, save_format, quality=95
+                ))
             )
+            if keep_animation:
+                estimated_size *= probe.frames
+            estimate_text = f"~{format_file_size(estimated_size)}"
+            if estimate_kind == "proxy" and max(new_width, new_height) > max(proxy_image.size):
+                # A prévia tem menos detalhe que a saída ampliada: o número é só uma ordem de grandeza
+                estimate_text += ", aproximado pela prévia"
+            if max_file_bytes:
+                st.caption(
+                    f"Tamanho máximo: {format_file_size(max_file_bytes)} (qualidade ajustada automaticamente; "
+                    f"{estimate_text} na qualidade 95)"
+                )
+            else:
+                st.caption(f"Tamanho estimado do arquivo: {estimate_text}")
+            
+            result_kind = "animation" if keep_animation else "resize"
+            result_key = make_key(upload_hash, result_kind, astuple(resize_spec), save_format, quality_key)
+            encoded_image = image_cache.get(encode_key)
+            if encoded_image is None and job_queue is not None:
+                encoded_image = poll_job("download_job", encode_key, trace)
+                if encoded_image is not None:
+                    if disk_cache:
+                        disk_cache.put(result_key, encoded_image)
+                    image_cache.put(encode_key, encoded_image)
+            
+            if (
+                encoded_image is None
+                and "download_job" not in st.session_state
+                and st.button("⚙️ Preparar download", key="prepare_download")
+            ):
+                # Outro usuário ou processo pode já ter gerado o mesmo arquivo
+                encoded_image = disk_cache.get(result_key) if disk_cache else None
+                if encoded_image is None and job_queue is not None:
+                    # Resolução total e codificação em outro processo; a sessão continua respondendo
+                    submit_job(
+                        "download_job", encode_key, render_job,
+                        uploaded_file.getvalue(), resize_spec, save_format, 95, max_file_bytes, keep_animation
+                    )
+                    st.rerun()
+                elif encoded_image is None:
+                    if keep_animation:
+                        # Todos os quadros, redimensionados em paralelo e enviados ao codificador em ordem
+                        encoded_image = measured("animation", lambda: encode_animation(
+                            uploaded_file.getvalue(), resize_spec, save_format, quality=95
+                        ))
+                    elif max_file_bytes:
+                        full_image = render_full_resolution()
+                        encoded_image, _ = measured("encode", lambda: encode_to_size(full_image, save_format, max_file_bytes))
+                    else:
+                        full_image = render_full_resolution()
+                        encoded_image = measured("encode", lambda: encode_image(full_image, save_format, quality=95))
+                    if disk_cache:
+                        disk_cache.put(result_key, encoded_image)
+                image_cache.put(encode_key, encoded_image)
+            
+            if encoded_image is not None:
+                if max_file_bytes and len(encoded_image) > max_file_bytes:
+                    st.warning("Mesmo na qualidade mínima o arquivo passa do limite. Reduza as dimensões ou use outro formato.")
+                st.download_button(
+                    label=f"⬇️ Baixar imagem redimensionada ({new_width}x{new_height}, {format_file_size(len(encoded_image))})",
+                    data=encoded_image,
+                    file_name=file_name,
+                    mime=f"image/{save_format.lower()}",
+                    type="primary"
+                )
         else:
             with col2:
                 if resize_mode == "Presets de Redes Sociais":
@@ -415,6 +678,89 @@ if uploaded_file is not None:
                     st.info("Ajuste a porcentagem para ver a imagem redimensionada")
                 else:
                     st.info("Ajuste as dimensões para ver a imagem redimensionada")
+        
+        # Gerar todos os tamanhos da rede selecionada a partir de um único decode
+        if resize_mode == "Presets de Redes Sociais" and selected_social:
+            with st.expander(f"📦 Todos os tamanhos de {selected_social} (ZIP)"):
+                fanout_method = st.radio(
+                    "Método para os presets com proporção diferente",
+                    list(METHOD_LABELS.keys()),
+                    index=1,
+                    horizontal=True,
+                    key="fanout_method"
+                )
+                fanout_quality = st.radio(
+                    "Qualidade",
+                    list(QUALITY_LABELS.keys()),
+                    index=1,
+                    horizontal=True,
+                    key="fanout_quality",
+                    help="Rápida: todos os tamanhos partem de uma pirâmide de resoluções compartilhada."
+                )
+                fanout_format_option = st.selectbox(
+                    "Formato dos arquivos",
+                    ["Manter formato original", "JPEG", "PNG", "WEBP"],
+                    key="fanout_format"
+                )
+                fanout_format = resolve_save_format(fanout_format_option, original_format)
+                
+                fanout_key = (upload_hash, "fanout", selected_social, fanout_method, fanout_quality, fanout_format)
+                fanout_zip = archives.get(fanout_key)
+                if fanout_zip is None and st.button(f"Gerar {len(SOCIAL_MEDIA_PRESETS[selected_social])} tamanhos", key="fanout_generate"):
+                    fanout_specs = {
+                        preset: ResizeSpec(
+                            *size,
+                            method=METHOD_LABELS[fanout_method],
+                            quality=QUALITY_LABELS[fanout_quality],
+                        )
+                        for preset, size in SOCIAL_MEDIA_PRESETS[selected_social].items()
+                    }
+                    # Cada tamanho é renderizado, codificado e gravado no ZIP antes do próximo
+                    fanout_entries = (
+                        (
+                            preset_file_name(selected_social, preset, rendered.size, fanout_format),
+                            encode_image(rendered, fanout_format, quality=95)
+                        )
+                        for preset, rendered in iter_render_presets(load_original(), fanout_specs)
+                    )
+                    try:
+                        fanout_zip = archives.build(fanout_key, fanout_entries, "zip")
+                    except ArchiveTooLargeError as e:
+                        st.error(str(e))
+                if fanout_zip is not None:
+                    st.download_button(
+                        label=f"⬇️ Baixar todos os tamanhos de {selected_social} (ZIP, {format_file_size(len(fanout_zip))})",
+                        data=fanout_zip,
+                        file_name=f"{safe_name(selected_social)}_todos_os_tamanhos.zip",
+                        mime=ARCHIVE_MIME_TYPES["zip"],
+                        type="primary"
+                    )
+        
+        # Tempos e memória de cada etapa desta execução
+        if show_performance:
+            with st.expander("⏱️ Desempenho", expanded=False):
+                if trace.stages:
+                    st.table([
+                        {
+                            "Etapa": entry["stage"],
+                            "Tempo (ms)": round(entry["seconds"] * 1000, 1),
+                            "Bytes gerados": format_file_size(entry["bytes"]),
+                            "Variação de RSS": format_file_size(entry["rss_delta"]) if entry["rss_delta"] is not None else "-",
+                        }
+                        for entry in trace.stages
+                    ])
+                    st.caption(f"Total: {trace.total_seconds * 1000:.1f} ms (etapas em cache não aparecem)")
+                else:
+                    st.caption("Todas as etapas vieram do cache nesta execução.")
+                if disk_cache:
+                    disk_stats = disk_cache.stats()
+                    st.caption(
+                        f"Cache em disco: {disk_stats['hits']} acertos, {disk_stats['misses']} erros "
+                        f"({disk_stats['hit_rate']:.0%}), {disk_stats['entries']} arquivos, "
+                        f"{format_file_size(disk_stats['bytes'])} de {format_file_size(disk_stats['max_bytes'])}, "
+                        f"{disk_stats['evictions']} remoções"
+                    )
+                st.code(prometheus_text(), language="text")
     except Exception as e:
         st.error(f"Erro ao processar a imagem: {str(e)}")
         st.info("Por favor, verifique se o arquivo é uma imagem válida.")
@@ -460,16 +806,19 @@ else:
 st.sidebar.markdown("---")
 st.sidebar.subheader("🗂 Conversor de Imagens")
 
-converter_file = st.sidebar.file_uploader(
-    "Selecione uma imagem para converter",
-    type=['png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp', 'tiff'],
+converter_files = st.sidebar.file_uploader(
+    "Selecione imagens para converter",
+    type=['png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp', 'tiff', 'tif'],
+    accept_multiple_files=True,
     key="converter_uploader",
-    help="Envie uma imagem para apenas converter o formato, sem redimensionar."
+    help="Envie uma ou várias imagens para apenas converter o formato, sem redimensionar."
 )
+# Um arquivo usa a conversão com prévia; vários são convertidos em lote e entregues em um ZIP
+converter_file = converter_files[0] if len(converter_files) == 1 else None
 
 converter_output_format = st.sidebar.selectbox(
     "Formato de saída do conversor",
-    ["JPEG", "PNG", "WEBP", "BMP", "TIFF"],
+    CONVERTER_OUTPUT_FORMATS,
     index=1,
     help="Formato do arquivo convertido."
 )
@@ -483,46 +832,213 @@ converter_quality = st.sidebar.slider(
     help="Afeta apenas formatos com qualidade configurável (JPEG e WEBP)."
 )
 
+converter_max_kb = int(st.sidebar.number_input(
+    "Tamanho máximo do arquivo convertido (KB)",
+    min_value=0,
+    value=0,
+    step=50,
+    help="0 = usa a qualidade acima. Com um limite, JPEG/WEBP usam a maior qualidade cujo arquivo cabe nele."
+))
+
 if converter_file is not None:
     try:
-        conv_image = Image.open(converter_file)
-        conv_original_format = conv_image.format or "Desconhecido"
+        conv_hash = content_hash(converter_file.getvalue())
+        conv_probe = image_cache.get_or_compute((conv_hash, "probe"), lambda: probe_image(converter_file.getvalue()))
+        check_input_budget(conv_probe)
+        conv_original_format = conv_probe.format or "Desconhecido"
+        
+        def load_conv_image():
+            # Decodificada só para codificar, nunca só para mostrar ou estimar
+            return image_cache.get_or_compute(
+                (conv_hash, "original", 1), lambda: decode_image(converter_file.getvalue())
+            )
         
         conv_col1, conv_col2 = st.columns(2)
         
         with conv_col1:
             st.subheader("🗂 Conversor de Imagens")
-            st.image(conv_image, caption=f"Imagem original ({conv_original_format})", use_container_width=True)
-            st.info(f"**Formato original:** {conv_original_format}\n\n**Dimensões:** {conv_image.width} x {conv_image.height} pixels")
+            st.info(
+                f"**Formato original:** {conv_original_format}\n\n"
+                f"**Dimensões:** {conv_probe.width} x {conv_probe.height} pixels ({conv_probe.mode})\n\n"
+                f"**Arquivo:** {format_file_size(conv_probe.file_bytes)}"
+            )
+            conv_proxy = image_cache.get_or_compute(
+                (conv_hash, "proxy"), lambda: decode_proxy(converter_file.getvalue())
+            )
+            st.image(conv_proxy, caption=f"Imagem original ({conv_original_format})", use_container_width=True)
         
-        # Preparar conversão
-        conv_buffer = io.BytesIO()
+        # Preparar conversão (codificada só quando pedida)
         conv_save_format = converter_output_format.upper()
-        
-        # Ajustar modo para formatos sem transparência
-        conv_to_save = conv_image
-        if conv_save_format in ["JPEG", "BMP"] and conv_image.mode in ["RGBA", "LA", "P"]:
-            conv_to_save = conv_image.convert("RGB")
-        
-        save_kwargs = {}
-        if conv_save_format in ["JPEG", "WEBP"]:
-            save_kwargs["quality"] = int(converter_quality)
-        
-        conv_to_save.save(conv_buffer, format=conv_save_format, **save_kwargs)
-        conv_buffer.seek(0)
+        conv_max_bytes = converter_max_kb * 1024 if conv_save_format in QUALITY_FORMATS else 0
+        conv_quality_key = ("max_bytes", conv_max_bytes) if conv_max_bytes else int(converter_quality)
+        conv_key = (conv_hash, "convert", conv_save_format, conv_quality_key)
         
         with conv_col2:
             st.subheader("📥 Download da imagem convertida")
-            conv_file_name_base = converter_file.name.rsplit(".", 1)[0]
-            conv_file_name = f"{conv_file_name_base}_convertida.{conv_save_format.lower()}"
+            conv_file_name = converted_file_name(converter_file.name, conv_save_format)
             
-            st.download_button(
-                label=f"⬇️ Baixar imagem convertida ({conv_save_format})",
-                data=conv_buffer,
-                file_name=conv_file_name,
-                mime=f"image/{conv_save_format.lower()}",
-                type="primary",
-            )
+            if conv_max_bytes:
+                st.caption(f"Tamanho máximo: {format_file_size(conv_max_bytes)} (qualidade ajustada automaticamente)")
+            else:
+                # Da original se já decodificada; senão do proxy, sem decodificar só para mostrar um número
+                conv_source = image_cache.get((conv_hash, "original", 1))
+                if conv_source is not None:
+                    conv_estimated_size = image_cache.get_or_compute(
+                        ("estimate", "original") + conv_key,
+                        lambda: estimate_encoded_size(conv_source, conv_save_format, quality=converter_quality)
+                    )
+                    st.caption(f"Tamanho estimado do arquivo: ~{format_file_size(conv_estimated_size)}")
+                else:
+                    # Amostras renderizadas do proxy no tamanho real, como numa ampliação sem distorção
+                    conv_estimated_size = image_cache.get_or_compute(
+                        ("estimate", "proxy") + conv_key,
+                        lambda: estimate_output_size(
+                            conv_proxy, ResizeSpec(*conv_probe.size), conv_save_format, quality=converter_quality
+                        )
+                    )
+                    approximate = ", aproximado pela prévia" if conv_proxy.size != conv_probe.size else ""
+                    st.caption(f"Tamanho estimado do arquivo: ~{format_file_size(conv_estimated_size)}{approximate}")
+            
+            conv_result_key = make_key(*conv_key)
+            conv_encoded = image_cache.get(conv_key)
+            if conv_encoded is None and job_queue is not None:
+                conv_encoded = poll_job("conversion_job", conv_key)
+                if conv_encoded is not None:
+                    if disk_cache:
+                        disk_cache.put(conv_result_key, conv_encoded)
+                    image_cache.put(conv_key, conv_encoded)
+            
+            if (
+                conv_encoded is None
+                and "conversion_job" not in st.session_state
+                and st.button("⚙️ Preparar conversão", key="prepare_conversion")
+            ):
+                conv_encoded = disk_cache.get(conv_result_key) if disk_cache else None
+                if conv_encoded is None and job_queue is not None:
+                    submit_job(
+                        "conversion_job", conv_key, convert_job,
+                        converter_file.getvalue(), conv_save_format, int(converter_quality), conv_max_bytes
+                    )
+                    st.rerun()
+                elif conv_encoded is None:
+                    if conv_max_bytes:
+                        conv_encoded, _ = encode_to_size(load_conv_image(), conv_save_format, conv_max_bytes)
+                    else:
+                        conv_encoded = encode_image(load_conv_image(), conv_save_format, quality=converter_quality)
+                    if disk_cache:
+                        disk_cache.put(conv_result_key, conv_encoded)
+                image_cache.put(conv_key, conv_encoded)
+            
+            if conv_encoded is not None:
+                if conv_max_bytes and len(conv_encoded) > conv_max_bytes:
+                    st.warning("Mesmo na qualidade mínima o arquivo passa do limite.")
+                st.download_button(
+                    label=f"⬇️ Baixar imagem convertida ({conv_save_format}, {format_file_size(len(conv_encoded))})",
+                    data=conv_encoded,
+                    file_name=conv_file_name,
+                    mime=f"image/{conv_save_format.lower()}",
+                    type="primary",
+                )
     except Exception as e:
         st.error(f"Erro ao converter a imagem: {str(e)}")
         st.info("Verifique se o arquivo enviado é uma imagem válida.")
+elif converter_files:
+    st.subheader(f"🗂 Conversor de Imagens ({len(converter_files)} arquivos)")
+    
+    conv_save_format = converter_output_format.upper()
+    conv_max_bytes = converter_max_kb * 1024 if conv_save_format in QUALITY_FORMATS else 0
+    conv_quality_key = ("max_bytes", conv_max_bytes) if conv_max_bytes else int(converter_quality)
+    conv_batch_key = (
+        tuple(content_hash(file.getvalue()) for file in converter_files),
+        "convert_batch", conv_save_format, conv_quality_key
+    )
+    
+    def store_conversion(outcomes, started):
+        # Cada arquivo convertido vai para o ZIP assim que chega; só o resumo fica no cache
+        errors = []
+        used_names = set()
+        
+        def entries():
+            for name, data, error in outcomes:
+                if error:
+                    errors.append((name, error))
+                    continue
+                yield unique_name(converted_file_name(name, conv_save_format), used_names), data
+        
+        try:
+            archive = archives.build(conv_batch_key, entries(), "zip")
+        except ArchiveTooLargeError as e:
+            st.error(str(e))
+            return None
+        summary = (len(used_names), tuple(errors), time.perf_counter() - started, len(archive))
+        image_cache.put(conv_batch_key, summary)
+        return summary
+    
+    # O resumo só vale enquanto o ZIP desta sessão existir
+    conv_summary = image_cache.get(conv_batch_key) if archives.get(conv_batch_key) is not None else None
+    if conv_summary is None and job_queue is not None:
+        conv_batch = poll_job_group("conversion_batch", conv_batch_key)
+        if conv_batch is not None:
+            batch_outcomes, batch_seconds = conv_batch
+            conv_summary = store_conversion(batch_outcomes, time.perf_counter() - batch_seconds)
+    
+    if (
+        conv_summary is None
+        and "conversion_batch" not in st.session_state
+        and st.button(f"⚙️ Converter {len(converter_files)} arquivos para {conv_save_format}", key="prepare_conversion_batch")
+    ):
+        if job_queue is not None:
+            # Um trabalho por arquivo: decode e codificação em paralelo nos processos do servidor
+            submit_job_group(
+                "conversion_batch", conv_batch_key, convert_job,
+                [
+                    (file.name, (file.getvalue(), conv_save_format, int(converter_quality), conv_max_bytes))
+                    for file in converter_files
+                ]
+            )
+            st.rerun()
+        
+        def convert_each():
+            # Convertido e gravado no ZIP um arquivo por vez
+            for file in converter_files:
+                try:
+                    check_input_budget(probe_image(file.getvalue()))
+                    yield file.name, convert_image_bytes(
+                        file.getvalue(), conv_save_format, int(converter_quality), conv_max_bytes
+                    ), None
+                except Exception as e:
+                    yield file.name, None, str(e)
+        
+        conv_summary = store_conversion(convert_each(), time.perf_counter())
+    
+    if conv_summary is not None:
+        converted_count, batch_errors, batch_seconds, archive_bytes = conv_summary
+        batch_megapixels = 0.0
+        for file in converter_files:
+            try:
+                # Só o cabeçalho é lido para somar os megapixels
+                batch_megapixels += probe_image(file.getvalue()).megapixels
+            except Exception:
+                pass
+        workers = job_queue.max_workers if job_queue is not None else 1
+        st.success(
+            f"{converted_count} de {len(converter_files)} arquivo(s) convertido(s) em {batch_seconds:.1f}s: "
+            f"{throughput_summary(converted_count, batch_megapixels, batch_seconds, min(workers, len(converter_files)))}"
+        )
+        if batch_errors:
+            st.error(f"{len(batch_errors)} arquivo(s) com erro:")
+            st.table([{"Arquivo": name, "Erro": error} for name, error in batch_errors])
+        
+        if converted_count:
+            st.download_button(
+                label=f"⬇️ Baixar ZIP ({converted_count} arquivos, {format_file_size(archive_bytes)})",
+                data=archives.get(conv_batch_key),
+                file_name=f"convertidas_{conv_save_format.lower()}.zip",
+                mime=ARCHIVE_MIME_TYPES["zip"],
+                type="primary",
+            )
+
+# Enquanto houver trabalhos desta sessão em andamento, o script roda de novo para atualizar o progresso
+if active_jobs:
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
@@ -0,0 +1,112 @@
+"""Escrita incremental de arquivos ZIP/TAR com memória limitada.
+
+As saídas são codificadas uma de cada vez e gravadas no arquivo compactado
+assim que ficam prontas, de modo que só uma imagem codificada fica na memória
+por vez, além do próprio arquivo compactado.
+
+O ``st.download_button`` precisa dos bytes inteiros, então o arquivo pronto
+fica na memória de qualquer forma. :class:`ArchiveStore` guarda os arquivos
+de uma sessão por chave (cada um é gerado uma única vez) e limita o total de
+bytes por sessão: a geração para assim que passa do teto, e os arquivos
+mais antigos saem para dar lugar aos novos.
+"""
+
+import io
+import os
+import tarfile
+import time
+import zipfile
+from collections import OrderedDict
+from typing import BinaryIO, Callable, Hashable, Iterable, Optional, Tuple, Union
+
+# Teto de bytes de arquivos compactados guardados por sessão, incluindo o que está sendo gerado (MB)
+DEFAULT_MAX_SESSION_MB = int(os.environ.get("REDIMENSIONADOR_ARCHIVE_MEMORY_MB", "256"))
+
+ARCHIVE_FORMATS = ("zip", "tar")
+
+ARCHIVE_MIME_TYPES = {
+    "zip": "application/zip",
+    "tar": "application/x-tar",
+}
+
+# Uma entrada é um nome de arquivo e os bytes, ou uma função que os produz sob demanda
+EntryData = Union[bytes, Callable[[], bytes]]
+
+
+def write_archive(entries: Iterable[Tuple[str, EntryData]], fileobj: BinaryIO, archive_format: str = "zip") -> int:
+    """Grava as entradas em ``fileobj`` uma de cada vez e retorna quantas foram gravadas."""
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f"Formato de arquivo compactado desconhecido: {archive_format}")
+
+    count = 0
+    if archive_format == "zip":
+        # Imagens já são comprimidas; ZIP_STORED evita gastar CPU à toa
+        with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_STORED) as archive:
+            for name, data in entries:
+                archive.writestr(name, data() if callable(data) else data)
+                count += 1
+    else:
+        with tarfile.open(fileobj=fileobj, mode="w|") as archive:
+            for name, data in entries:
+                payload = data() if callable(data) else data
+                info = tarfile.TarInfo(name)
+                info.size = len(payload)
+                info.mtime = int(time.time())
+                archive.addfile(info, io.BytesIO(payload))
+                count += 1
+    return count
+
+
+class ArchiveTooLargeError(ValueError):
+    """O arquivo compactado passaria do teto de bytes da sessão."""
+
+
+class ArchiveStore:
+    """Arquivos compactados prontos de uma sessão, por chave, com teto de bytes."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_SESSION_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._archives: "OrderedDict[Hashable, bytes]" = OrderedDict()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(data) for data in self._archives.values())
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        data = self._archives.get(key)
+        if data is not None:
+            self._archives.move_to_end(key)
+        return data
+
+    def build(self, key: Hashable, entries: Iterable[Tuple[str, EntryData]], archive_format: str = "zip") -> bytes:
+        """Gera (ou reaproveita) o arquivo de ``key``.
+
+        Enquanto o novo arquivo cresce, os mais antigos saem para manter o
+        total abaixo do teto; se mesmo sozinho ele passar do teto, a geração
+        para na entrada seguinte e :class:`ArchiveTooLargeError` é levantada.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        buffer = io.BytesIO()
+
+        def fits() -> bool:
+            while self._archives and buffer.tell() + self.nbytes > self.max_bytes:
+                self._archives.popitem(last=False)
+            return buffer.tell() <= self.max_bytes
+
+        def limited():
+            for name, data in entries:
+                if not fits():
+                    break
+                yield name, data
+
+        write_archive(limited(), buffer, archive_format)
+        if not fits():
+            raise ArchiveTooLargeError(
+                f"O arquivo compactado passou do limite de {self.max_bytes // (1024 * 1024)} MB por sessão"
+            )
+        data = buffer.getvalue()
+        self._archives[key] = data
+        return data
@@ -0,0 +1,420 @@
+"""Processamento em lote, sem interface, dos presets de redes sociais.
+
+Exemplo::
+
+    python batch.py fotos/ "capturas/*.png" -p Instagram/Stories -p YouTube/Thumbnail \\
+        -m crop -f webp -o saida/ -w 8
+"""
+
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+import warnings
+from dataclasses import astuple
+from multiprocessing import Pool
+from typing import Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from PIL import Image
+
+from animation import encode_animation
+from disk_cache import get_default_disk_cache, make_key
+from image_cache import content_hash, estimate_nbytes
+from image_engine import (
+    ANCHORS,
+    ANIMATED_FORMATS,
+    ANCHOR_CENTER,
+    BACKENDS,
+    BACKEND_PILLOW,
+    METHODS,
+    METHOD_CROP,
+    QUALITY_EXACT,
+    QUALITY_FAST,
+    QUALITY_FORMATS,
+    ResizeSpec,
+    decode_for_specs,
+    encode_image,
+    encode_to_size,
+    expand_preset_names,
+    get_preset,
+    iter_render_presets,
+    preset_file_name,
+    resolve_save_format,
+)
+from instrumentation import ENABLED_BY_DEFAULT, Trace
+from layout import Layout, plan_layouts, plan_summary
+from probe import check_input_budget, probe_image
+
+# Extensões reconhecidas ao percorrer diretórios
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp", ".tif", ".tiff"}
+
+
+class BatchTask(NamedTuple):
+    """Trabalho de um único arquivo de entrada, enviado aos processos."""
+
+    path: str
+    presets: Tuple[Tuple[str, str], ...]
+    method: str
+    output_format: str
+    quality: int
+    resize_quality: str
+    output_dir: str
+    per_image_dirs: bool = False
+    metrics: bool = False
+    backend: str = BACKEND_PILLOW
+    use_disk_cache: bool = True
+    anchor: str = ANCHOR_CENTER
+    max_bytes: int = 0
+    output_stem: str = ""
+    # Linha do plano do lote (um Layout por preset), calculada para o tamanho do cabeçalho
+    layouts: Tuple[Layout, ...] = ()
+
+
+class BatchResult(NamedTuple):
+    """Resultado de um arquivo: saídas geradas ou a mensagem de erro."""
+
+    path: str
+    outputs: Tuple[str, ...]
+    error: Optional[str]
+    seconds: float
+
+
+def expand_inputs(inputs: Iterable[str]) -> List[str]:
+    """Expande diretórios e padrões glob em uma lista ordenada de arquivos."""
+    files = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                for name in names:
+                    if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                        files.add(os.path.join(root, name))
+        else:
+            matches = glob.glob(item, recursive=True) if glob.has_magic(item) else [item]
+            files.update(path for path in matches if os.path.isfile(path))
+    return sorted(files)
+
+
+def unique_name(name: str, used: Set[str]) -> str:
+    """Evita nomes repetidos acrescentando ``_2``, ``_3``... antes da extensão."""
+    candidate = name
+    base, extension = os.path.splitext(name)
+    counter = 2
+    while candidate in used:
+        candidate = f"{base}_{counter}{extension}"
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+
+def relative_inputs(paths: Iterable[str]) -> List[str]:
+    """Caminhos relativos à pasta comum das entradas, para preservar subpastas nas saídas."""
+    paths = list(paths)
+    if not paths:
+        return []
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+    return [os.path.relpath(os.path.abspath(path), root) for path in paths]
+
+
+def output_stems(paths: Iterable[str]) -> List[str]:
+    """Prefixo de saída de cada entrada: o caminho relativo sem extensão, sem repetições.
+
+    ``a/foto.jpg`` e ``b/foto.png`` viram ``a/foto`` e ``b/foto``; ``foto.jpg``
+    e ``foto.png`` na mesma pasta viram ``foto`` e ``foto_2``.
+    """
+    used: Set[str] = set()
+    return [unique_name(os.path.splitext(relative)[0], used) for relative in relative_inputs(paths)]
+
+
+def process_file(task: BatchTask) -> BatchResult:
+    """Decodifica um arquivo uma vez e gera uma saída para cada preset.
+
+    Os presets compartilham o decode e, no modo rápido, a pirâmide de
+    resoluções intermediárias. A geometria vem do plano calculado para o
+    lote inteiro (``task.layouts``), salvo quando o decode muda o tamanho.
+    """
+    start = time.perf_counter()
+    trace = Trace(label=task.path, enabled=task.metrics)
+    try:
+        with trace.stage("read") as stage:
+            with open(task.path, "rb") as file:
+                data = file.read()
+            stage.nbytes = len(data)
+
+        specs = [
+            ResizeSpec(
+                *get_preset(social, preset),
+                method=task.method,
+                quality=task.resize_quality,
+                backend=task.backend,
+                anchor=task.anchor,
+            )
+            for social, preset in task.presets
+        ]
+
+        # Só o cabeçalho: recusa entradas acima do limite e descobre o formato original para "keep"
+        with trace.stage("probe"):
+            probe = probe_image(data)
+        check_input_budget(probe)
+        animated = probe.animated
+        save_format = resolve_save_format(task.output_format, probe.format, animated)
+        # Animações em GIF/WEBP têm todos os quadros redimensionados
+        keep_animation = animated and save_format in ANIMATED_FORMATS
+        # Com tamanho máximo, a qualidade é escolhida por arquivo; a chave registra o limite no lugar dela
+        max_bytes = task.max_bytes if save_format in QUALITY_FORMATS and not keep_animation else 0
+        quality_key = ("max_bytes", max_bytes) if max_bytes else task.quality
+        stem = task.output_stem or os.path.splitext(os.path.basename(task.path))[0]
+
+        # Um diretório por imagem de entrada, com um arquivo por preset; subpastas das entradas são mantidas
+        if task.per_image_dirs:
+            output_dir = os.path.join(task.output_dir, stem)
+            prefix = ""
+        else:
+            output_dir = os.path.join(task.output_dir, os.path.dirname(stem))
+            prefix = f"{os.path.basename(stem)}_"
+        os.makedirs(output_dir, exist_ok=True)
+        used_names: Set[str] = set()
+        file_names = {
+            (social, preset): unique_name(f"{prefix}{preset_file_name(social, preset, spec.size, save_format)}", used_names)
+            for (social, preset), spec in zip(task.presets, specs)
+        }
+
+        # Presets já gerados antes (por qualquer processo) vêm direto do cache em disco
+        disk_cache = get_default_disk_cache() if task.use_disk_cache else None
+        input_hash = content_hash(data)
+        result_keys = {
+            preset: make_key(
+                input_hash, "animation" if keep_animation else "resize", astuple(spec), save_format, quality_key
+            )
+            for preset, spec in zip(task.presets, specs)
+        }
+        outputs = []
+        pending = {}
+        for (social, preset), spec in zip(task.presets, specs):
+            cached = disk_cache.get(result_keys[(social, preset)]) if disk_cache else None
+            if cached is None:
+                pending[(social, preset)] = spec
+                continue
+            output_path = os.path.join(output_dir, file_names[(social, preset)])
+            with open(output_path, "wb") as file:
+                file.write(cached)
+            outputs.append(output_path)
+
+        if not pending:
+            return BatchResult(task.path, tuple(outputs), None, time.perf_counter() - start)
+
+        def write_output(social, preset, encoded):
+            if disk_cache:
+                disk_cache.put(result_keys[(social, preset)], encoded)
+            output_path = os.path.join(output_dir, file_names[(social, preset)])
+            with open(output_path, "wb") as file:
+                file.write(encoded)
+            outputs.append(output_path)
+
+        if keep_animation:
+            # Cada preset decodifica os quadros de novo; o seek não permite compartilhar o decode
+            for (social, preset), spec in pending.items():
+                with trace.stage("animation") as stage:
+                    encoded = encode_animation(data, spec, save_format, quality=task.quality)
+                    stage.nbytes = len(encoded)
+                write_output(social, preset, encoded)
+            return BatchResult(task.path, tuple(outputs), None, time.perf_counter() - start)
+
+        with trace.stage("decode") as stage:
+            image = decode_for_specs(data, list(pending.values()))
+            stage.nbytes = estimate_nbytes(image)
+
+        # Presets que pedem a mesma imagem escalada compartilham um único redimensionamento
+        with trace.stage("plan"):
+            if task.layouts and image.size == probe.size:
+                layouts = [layout for name, layout in zip(task.presets, task.layouts) if name in pending]
+            else:
+                # O decode reduzido (JPEG no modo rápido) muda o tamanho: a geometria é refeita para ele
+                layouts = plan_layouts([image.size], list(pending.values()))[0]
+        rendered = iter_render_presets(image, pending, layouts)
+        while True:
+            with trace.stage("resize") as stage:
+                item = next(rendered, None)
+                stage.nbytes = estimate_nbytes(item[1]) if item else 0
+            if item is None:
+                break
+            (social, preset), resized = item
+            with trace.stage("encode") as stage:
+                if max_bytes:
+                    encoded, _ = encode_to_size(resized, save_format, max_bytes)
+                else:
+                    encoded = encode_image(resized, save_format, quality=task.quality)
+                stage.nbytes = len(encoded)
+            write_output(social, preset, encoded)
+        return BatchResult(task.path, tuple(outputs), None, time.perf_counter() - start)
+    except Exception as e:
+        return BatchResult(task.path, (), str(e), time.perf_counter() - start)
+
+
+def header_sizes(files: List[str], report_errors: bool = False) -> List[Optional[Tuple[int, int]]]:
+    """Dimensões de cada arquivo lidas só do cabeçalho.
+
+    ``None`` se o arquivo não abre ou passa do limite de pixels do Pillow; o
+    erro de cada um aparece quando ele é processado (ou aqui, com
+    ``report_errors``), sem interromper os demais.
+    """
+    sizes = []
+    for path in files:
+        try:
+            with warnings.catch_warnings():
+                # Arquivos grandes demais são recusados pelo probe de cada processo
+                warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+                with Image.open(path) as header:
+                    sizes.append(header.size)
+        except (OSError, Image.DecompressionBombError) as e:
+            if report_errors:
+                print(f"Erro em {path}: {e}", file=sys.stderr)
+            sizes.append(None)
+    return sizes
+
+
+def plan_batch(files: List[str], presets: Tuple[Tuple[str, str], ...], method: str) -> List[Tuple[Layout, ...]]:
+    """Geometria de todos os presets para todos os arquivos, numa única passada.
+
+    Arquivos cujo cabeçalho não abre recebem uma linha vazia; o erro aparece
+    ao processá-los.
+    """
+    sizes = header_sizes(files)
+    specs = [ResizeSpec(*get_preset(social, preset), method=method) for social, preset in presets]
+    rows = iter(plan_layouts([size for size in sizes if size], specs))
+    return [tuple(next(rows)) if size else () for size in sizes]
+
+
+def print_plan(files: List[str], presets: Tuple[Tuple[str, str], ...], method: str) -> int:
+    """Mostra, lendo só os cabeçalhos, quantos redimensionamentos o lote exige."""
+    sizes = [size for size in header_sizes(files, report_errors=True) if size]
+    specs = [ResizeSpec(*get_preset(social, preset), method=method) for social, preset in presets]
+    outputs, resizes = plan_summary(sizes, specs)
+    print(
+        f"{len(sizes)} imagem(ns) x {len(specs)} preset(s): {outputs} saída(s) com "
+        f"{resizes} redimensionamento(s) ({outputs - resizes} reaproveitado(s))"
+    )
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Aplica presets de redes sociais a muitas imagens em paralelo."
+    )
+    parser.add_argument("inputs", nargs="+", help="Arquivos, diretórios ou padrões glob de entrada")
+    parser.add_argument(
+        "-p", "--preset", action="append", required=True, dest="presets",
+        help='Preset no formato "Rede/Tipo", ex.: "Instagram/Stories", ou só "Rede" para todos (pode repetir)'
+    )
+    parser.add_argument("-m", "--method", choices=METHODS, default=METHOD_CROP, help="Método de redimensionamento")
+    parser.add_argument(
+        "-f", "--format", default="keep", type=str.upper, dest="output_format",
+        choices=["KEEP", "JPEG", "PNG", "WEBP"], help="Formato de saída (keep mantém o original)"
+    )
+    parser.add_argument(
+        "--anchor", choices=ANCHORS, default=ANCHOR_CENTER,
+        help="Posição do corte: centralizado ou automático (região com mais detalhes)"
+    )
+    parser.add_argument("-q", "--quality", type=int, default=95, help="Qualidade para JPEG/WEBP")
+    parser.add_argument(
+        "--max-size", type=int, default=0, metavar="KB",
+        help="Tamanho máximo de cada arquivo JPEG/WEBP; escolhe a maior qualidade que cabe (ignora -q)"
+    )
+    parser.add_argument("--fast", action="store_true", help="Usa decode reduzido e reducing_gap (mais rápido)")
+    parser.add_argument(
+        "--backend", choices=BACKENDS, default=BACKEND_PILLOW,
+        help="Backend de reamostragem (numpy usa várias threads por imagem)"
+    )
+    parser.add_argument(
+        "--no-disk-cache", action="store_true",
+        help="Não consulta nem grava o cache em disco compartilhado"
+    )
+    parser.add_argument("-o", "--output", default="saida", help="Diretório de saída")
+    parser.add_argument(
+        "--per-image-dirs", action="store_true",
+        help="Grava as saídas de cada imagem em um subdiretório próprio"
+    )
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Número de processos")
+    parser.add_argument(
+        "--metrics", action="store_true",
+        help="Emite no stderr uma linha JSON com tempo e bytes de cada etapa de cada arquivo"
+    )
+    parser.add_argument("--chunksize", type=int, default=4, help="Arquivos enviados por vez a cada processo")
+    parser.add_argument(
+        "--plan", action="store_true",
+        help="Só mostra quantos redimensionamentos o lote exige (lê apenas os cabeçalhos) e sai"
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.metrics:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    try:
+        # O mesmo preset pedido duas vezes (ex.: "Instagram" e "Instagram/Stories") é gerado uma vez
+        presets = tuple(dict.fromkeys(preset for name in args.presets for preset in expand_preset_names(name)))
+    except KeyError as e:
+        print(f"Erro: {e.args[0]}", file=sys.stderr)
+        return 2
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("Nenhuma imagem encontrada nas entradas informadas.", file=sys.stderr)
+        return 1
+    if args.plan:
+        return print_plan(files, presets, args.method)
+
+    os.makedirs(args.output, exist_ok=True)
+    tasks = [
+        BatchTask(
+            path,
+            presets,
+            args.method,
+            args.output_format,
+            args.quality,
+            QUALITY_FAST if args.fast else QUALITY_EXACT,
+            args.output,
+            args.per_image_dirs,
+            args.metrics or ENABLED_BY_DEFAULT,
+            args.backend,
+            not args.no_disk_cache,
+            args.anchor,
+            args.max_size * 1024,
+            stem,
+            layouts,
+        )
+        for path, stem, layouts in zip(files, output_stems(files), plan_batch(files, presets, args.method))
+    ]
+
+    start = time.perf_counter()
+    errors = 0
+    written = set()
+    with Pool(processes=max(1, args.workers)) as pool:
+        for done, result in enumerate(pool.imap_unordered(process_file, tasks, chunksize=max(1, args.chunksize)), 1):
+            if result.error:
+                errors += 1
+                print(f"\nErro em {result.path}: {result.error}", file=sys.stderr)
+            overwritten = written.intersection(result.outputs)
+            if overwritten:
+                errors += 1
+                print(f"\nErro em {result.path}: sobrescreveu {', '.join(sorted(overwritten))}", file=sys.stderr)
+            written.update(result.outputs)
+            print(f"\r[{done}/{len(tasks)}] {result.path}", end="", file=sys.stderr, flush=True)
+        # Encerra os workers normalmente (sem terminate) para que gravem os contadores do cache
+        pool.close()
+        pool.join()
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"\n{len(tasks) - errors} arquivo(s) processado(s), {errors} erro(s) em {elapsed:.1f}s "
+        f"({len(tasks) / elapsed:.1f} arquivos/s)",
+        file=sys.stderr,
+    )
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Conversão de formato em lote, sem interface e sem redimensionar.
+
+Exemplo::
+
+    python batch_convert.py digitalizacoes/ "extras/*.bmp" -f webp -q 85 --zip convertidas.zip -w 8
+
+Cada arquivo é decodificado e codificado em um processo do pool; erros são
+informados por arquivo sem interromper o lote. No fim, mostra o throughput
+total e por núcleo.
+"""
+
+import argparse
+import os
+import sys
+import time
+import zipfile
+from multiprocessing import Pool
+from typing import Iterable, List, NamedTuple, Optional, Set
+
+from batch import expand_inputs, relative_inputs, unique_name
+from image_engine import CONVERTER_OUTPUT_FORMATS, convert_image_bytes, converted_file_name
+from probe import check_input_budget, probe_image
+
+
+class ConvertTask(NamedTuple):
+    """Conversão de um arquivo; sem ``output_dir``, os bytes voltam ao processo principal."""
+
+    path: str
+    output_name: str
+    output_format: str
+    quality: int
+    max_bytes: int = 0
+    output_dir: Optional[str] = None
+
+
+class ConvertResult(NamedTuple):
+    """Resultado de um arquivo: bytes convertidos (ou caminho gravado) ou a mensagem de erro."""
+
+    path: str
+    output_name: str
+    data: Optional[bytes]
+    error: Optional[str]
+    seconds: float
+    megapixels: float
+
+
+def output_names(paths: Iterable[str], save_format: str) -> List[str]:
+    """Nomes de saída preservando a estrutura de pastas relativa às entradas."""
+    used: Set[str] = set()
+    names = []
+    for relative in relative_inputs(paths):
+        directory, file_name = os.path.split(relative)
+        name = converted_file_name(file_name, save_format)
+        names.append(unique_name(os.path.join(directory, name) if directory else name, used))
+    return names
+
+
+def throughput_summary(files: int, megapixels: float, elapsed: float, workers: int) -> str:
+    """Arquivos/s e MP/s no total e por núcleo usado."""
+    workers = max(1, workers)
+    elapsed = max(elapsed, 1e-9)
+    return (
+        f"{files / elapsed:.1f} arquivos/s, {megapixels / elapsed:.1f} MP/s "
+        f"({files / elapsed / workers:.2f} arquivos/s e {megapixels / elapsed / workers:.1f} MP/s por núcleo, "
+        f"{workers} núcleo(s))"
+    )
+
+
+def convert_file(task: ConvertTask) -> ConvertResult:
+    """Converte um arquivo; roda nos processos do pool."""
+    start = time.perf_counter()
+    megapixels = 0.0
+    try:
+        with open(task.path, "rb") as file:
+            data = file.read()
+        probe = probe_image(data)
+        megapixels = probe.megapixels
+        check_input_budget(probe)
+        converted = convert_image_bytes(data, task.output_format, task.quality, task.max_bytes)
+        if task.output_dir is None:
+            return ConvertResult(task.path, task.output_name, converted, None, time.perf_counter() - start, megapixels)
+
+        output_path = os.path.join(task.output_dir, task.output_name)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "wb") as file:
+            file.write(converted)
+        return ConvertResult(task.path, output_path, None, None, time.perf_counter() - start, megapixels)
+    except Exception as e:
+        return ConvertResult(task.path, task.output_name, None, str(e), time.perf_counter() - start, megapixels)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Converte muitas imagens de formato em paralelo.")
+    parser.add_argument("inputs", nargs="+", help="Arquivos, diretórios ou padrões glob de entrada")
+    parser.add_argument(
+        "-f", "--format", dest="output_format", type=str.upper, choices=CONVERTER_OUTPUT_FORMATS,
+        default="WEBP", help="Formato de saída"
+    )
+    parser.add_argument("-q", "--quality", type=int, default=90, help="Qualidade para JPEG/WEBP")
+    parser.add_argument(
+        "--max-size", type=int, default=0, metavar="KB",
+        help="Tamanho máximo de cada arquivo JPEG/WEBP; escolhe a maior qualidade que cabe (ignora -q)"
+    )
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("-o", "--output", default="convertidas", help="Diretório de saída")
+    output.add_argument("--zip", help="Grava todas as saídas em um único arquivo ZIP")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Número de processos")
+    parser.add_argument("--chunksize", type=int, default=4, help="Arquivos enviados por vez a cada processo")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("Nenhuma imagem encontrada nas entradas informadas.", file=sys.stderr)
+        return 1
+
+    output_dir = None if args.zip else args.output
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    tasks = [
+        ConvertTask(path, name, args.output_format, args.quality, args.max_size * 1024, output_dir)
+        for path, name in zip(files, output_names(files, args.output_format))
+    ]
+
+    workers = max(1, min(args.workers, len(tasks)))
+    start = time.perf_counter()
+    errors = 0
+    megapixels = 0.0
+    archive = zipfile.ZipFile(args.zip, "w", compression=zipfile.ZIP_STORED) if args.zip else None
+    try:
+        with Pool(processes=workers) as pool:
+            results = pool.imap_unordered(convert_file, tasks, chunksize=max(1, args.chunksize))
+            for done, result in enumerate(results, 1):
+                if result.error:
+                    errors += 1
+                    print(f"\nErro em {result.path}: {result.error}", file=sys.stderr)
+                else:
+                    megapixels += result.megapixels
+                    if archive is not None:
+                        # Cada arquivo é gravado no ZIP assim que chega, sem acumular os demais
+                        archive.writestr(result.output_name, result.data)
+                print(f"\r[{done}/{len(tasks)}] {result.path}", end="", file=sys.stderr, flush=True)
+    finally:
+        if archive is not None:
+            archive.close()
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"\n{len(tasks) - errors} arquivo(s) convertido(s), {errors} erro(s) em {elapsed:.1f}s: "
+        f"{throughput_summary(len(tasks) - errors, megapixels, elapsed, workers)}",
+        file=sys.stderr,
+    )
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
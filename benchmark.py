@@ -0,0 +1,299 @@
+"""Benchmark reprodutível do decode, redimensionamento e codificação.
+
+Gera imagens sintéticas (tamanhos, modos e formatos variados), mede cada
+etapa várias vezes e informa throughput (MP/s), latência p50/p95 e quanto o
+pico de memória residente (RSS) sobe durante a etapa. O resultado pode
+ser gravado em JSON e comparado com uma execução anterior para detectar
+regressões.
+
+Exemplo::
+
+    python benchmark.py --sizes 1920x1080 6000x4000 -r 5 -o atual.json
+    python benchmark.py --compare atual.json
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import io
+import json
+import multiprocessing
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from image_engine import (
+    BACKEND_NUMPY,
+    METHODS,
+    QUALITIES,
+    SOCIAL_MEDIA_PRESETS,
+    ResizeSpec,
+    decode_image,
+    encode_image,
+    resize_image,
+)
+from numpy_resample import NUMPY_AVAILABLE, VERIFY_TOLERANCE, max_difference_from_pillow
+
+# malloc_trim da glibc devolve ao sistema a memória já liberada, que senão continuaria no RSS
+_libc_path = ctypes.util.find_library("c")
+_malloc_trim = getattr(ctypes.CDLL(_libc_path), "malloc_trim", None) if _libc_path else None
+
+DEFAULT_SIZES = ["640x480", "1920x1080", "6000x4000"]
+
+# Formatos de entrada e os modos que cada um consegue gravar
+INPUT_FORMATS = {
+    "JPEG": ["RGB", "L"],
+    "PNG": ["RGB", "RGBA", "P", "L"],
+    "WEBP": ["RGB", "RGBA"],
+    "GIF": ["P", "L"],
+    "TIFF": ["RGB", "RGBA", "L"],
+}
+
+# Codificadores do redimensionador (qualidade fixa em 95) e do conversor
+ENCODER_SETTINGS = [
+    ("JPEG", 75), ("JPEG", 90), ("JPEG", 95),
+    ("WEBP", 75), ("WEBP", 90), ("WEBP", 95),
+    ("PNG", None), ("BMP", None), ("TIFF", None),
+]
+
+# Limite padrão de piora, em relação à execução comparada, para acusar regressão
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+
+
+def parse_size(text: str) -> Tuple[int, int]:
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def synthetic_image(size: Tuple[int, int], mode: str) -> Image.Image:
+    """Imagem com gradiente e ruído, parecida em compressibilidade com uma foto."""
+    width, height = size
+    gradient = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise(size, 40)
+    rotated = gradient.transpose(Image.Transpose.ROTATE_90).resize(size)
+    image = Image.merge("RGB", (gradient, noise, rotated))
+    if mode == "RGBA":
+        image.putalpha(Image.linear_gradient("L").resize(size).transpose(Image.Transpose.FLIP_LEFT_RIGHT))
+        return image
+    if mode == "P":
+        return image.quantize(256)
+    return image.convert(mode)
+
+
+def _status_kib(field: str) -> Optional[int]:
+    with open("/proc/self/status", encoding="ascii") as file:
+        for line in file:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1])
+    return None
+
+
+def _release_free_memory() -> None:
+    if _malloc_trim is not None:
+        _malloc_trim(0)
+
+
+def _reset_peak_rss() -> bool:
+    """Zera o pico de RSS do processo (Linux 4.0+); ``False`` se o sistema não permite."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _max_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KiB no Linux e em bytes no macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def stage_peak_mb(func: Callable[[], object]) -> Optional[float]:
+    """Quanto o pico de RSS sobe durante uma execução de ``func``, em MB.
+
+    O ``ru_maxrss`` é o pico da vida inteira do processo: depois da maior
+    etapa, todas as seguintes repetiriam o mesmo valor. No Linux o pico é
+    zerado antes da etapa e lido de ``VmHWM``; nos demais sistemas com fork
+    a etapa roda em um processo filho, cujo pico parte do uso atual. Antes,
+    a memória liberada pelas execuções anteriores volta ao sistema, para que
+    a etapa não seja medida sobre blocos que já estavam no RSS.
+    """
+    _release_free_memory()
+    if _reset_peak_rss():
+        start = _status_kib("VmRSS")
+        func()
+        return (_status_kib("VmHWM") - start) / 1024
+    if resource is None or "fork" not in multiprocessing.get_all_start_methods():
+        return None
+
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+
+    def child():
+        baseline = _max_rss_bytes()
+        func()
+        sender.send(_max_rss_bytes() - baseline)
+
+    process = context.Process(target=child)
+    process.start()
+    sender.close()
+    try:
+        return receiver.recv() / (1024 * 1024)
+    except EOFError:
+        return None
+    finally:
+        process.join()
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(name: str, func: Callable[[], object], megapixels: float, repeats: int, warmup: int = 1) -> Dict:
+    """Executa ``func`` ``repeats`` vezes e resume as latências."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    p50 = statistics.median(samples)
+    return {
+        "name": name,
+        "repeats": repeats,
+        "p50_ms": p50 * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "mp_per_s": megapixels / p50 if p50 > 0 else None,
+        "peak_delta_mb": stage_peak_mb(func),
+    }
+
+
+def run_cases(sizes: List[Tuple[int, int]], repeats: int, presets: bool) -> List[Dict]:
+    results = []
+
+    def record(result):
+        results.append(result)
+        print(
+            f"{result['name']:<70} p50={result['p50_ms']:9.2f}ms p95={result['p95_ms']:9.2f}ms "
+            f"{(result['mp_per_s'] or 0):8.1f} MP/s {(result['peak_delta_mb'] or 0):8.1f} MB",
+            file=sys.stderr,
+        )
+
+    for size in sizes:
+        megapixels = size[0] * size[1] / 1e6
+        label = f"{size[0]}x{size[1]}"
+
+        # Decode de cada formato/modo de entrada
+        for input_format, modes in INPUT_FORMATS.items():
+            for mode in modes:
+                buffer = io.BytesIO()
+                synthetic_image(size, mode).save(buffer, format=input_format)
+                data = buffer.getvalue()
+                record(measure(f"decode/{input_format}/{mode}/{label}", lambda: decode_image(data), megapixels, repeats))
+
+        source = synthetic_image(size, "RGB")
+
+        # Cada método e qualidade, para um alvo de proporção diferente
+        target = (max(1, size[0] // 3), max(1, size[1] // 2))
+        for method in METHODS:
+            for quality in QUALITIES:
+                spec = ResizeSpec(*target, method=method, quality=quality)
+                record(measure(f"resize/{method}/{quality}/{label}", lambda: resize_image(source, spec), megapixels, repeats))
+
+        # Backend NumPy multi-thread, com verificação contra o Pillow
+        if NUMPY_AVAILABLE:
+            for method in METHODS:
+                spec = ResizeSpec(*target, method=method, backend=BACKEND_NUMPY)
+                record(measure(f"resize/{method}/numpy/{label}", lambda: resize_image(source, spec), megapixels, repeats))
+            difference = max_difference_from_pillow(source, target)
+            status = "ok" if difference <= VERIFY_TOLERANCE else "FORA DA TOLERÂNCIA"
+            print(f"verificação numpy x pillow {label}: diferença máxima {difference} ({status})", file=sys.stderr)
+
+        # Cada preset de rede social, cortando
+        if presets:
+            for social, social_presets in SOCIAL_MEDIA_PRESETS.items():
+                for preset, preset_size in social_presets.items():
+                    spec = ResizeSpec(*preset_size, method="crop")
+                    record(measure(f"preset/{social}/{preset}/{label}", lambda: resize_image(source, spec), megapixels, repeats))
+
+        # Codificadores do redimensionador e do conversor
+        for mode in ["RGB", "RGBA"]:
+            encode_source = synthetic_image(size, mode)
+            for save_format, quality in ENCODER_SETTINGS:
+                name = f"encode/{save_format}/q{quality or '-'}/{mode}/{label}"
+                record(measure(
+                    name,
+                    lambda: encode_image(encode_source, save_format, quality=quality or 95),
+                    megapixels,
+                    repeats,
+                ))
+    return results
+
+
+def compare(current: List[Dict], baseline: List[Dict], threshold: float) -> int:
+    """Imprime a variação do p50 por caso e retorna quantas regressões houve."""
+    baseline_by_name = {result["name"]: result for result in baseline}
+    regressions = 0
+    for result in current:
+        previous = baseline_by_name.get(result["name"])
+        if not previous or not previous["p50_ms"]:
+            continue
+        change = result["p50_ms"] / previous["p50_ms"] - 1
+        flag = ""
+        if change > threshold:
+            regressions += 1
+            flag = "  <-- REGRESSÃO"
+        print(f"{result['name']:<70} {change * 100:+7.1f}%{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do motor de redimensionamento.")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="Tamanhos das imagens sintéticas (LxA)")
+    parser.add_argument("-r", "--repeats", type=int, default=5, help="Repetições por caso")
+    parser.add_argument("--no-presets", action="store_true", help="Não mede cada preset individualmente")
+    parser.add_argument("-o", "--output", help="Grava os resultados em JSON")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+        help="Piora relativa do p50 considerada regressão (0.10 = 10%%)"
+    )
+    args = parser.parse_args(argv)
+
+    results = run_cases([parse_size(size) for size in args.sizes], max(1, args.repeats), not args.no_presets)
+    report = {
+        "python": platform.python_version(),
+        "pillow": Image.__version__,
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        print(f"{regressions} regressão(ões) acima de {args.threshold * 100:.0f}%")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
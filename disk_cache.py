@@ -0,0 +1,242 @@
+"""Cache em disco, endereçado por conteúdo, dos arquivos gerados.
+
+A chave é o hash dos bytes de entrada junto com todos os parâmetros que
+afetam a saída (tamanho, método, corte, formato, qualidade...). O cache é
+compartilhado por todas as sessões e processos que apontam para o mesmo
+diretório:
+
+- cada entrada é gravada em um arquivo temporário e publicada com
+  ``os.replace``, então leitores nunca veem arquivos pela metade;
+- um acerto atualiza o mtime do arquivo, que serve de ordem LRU;
+- a remoção dos mais antigos, quando o total passa do limite, é protegida
+  por um ``flock``;
+- os acertos/erros são contados em memória por processo e somados ao
+  stats.json (sob o mesmo ``flock``) no máximo a cada
+  ``STATS_FLUSH_SECONDS`` e na saída do processo, para que a leitura de uma
+  entrada não passe por uma trava compartilhada por todos os workers.
+"""
+
+import atexit
+import hashlib
+import json
+import multiprocessing.util
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "REDIMENSIONADOR_DISK_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "redimensionador"),
+)
+DEFAULT_CACHE_MB = int(os.environ.get("REDIMENSIONADOR_DISK_CACHE_MB", "1024"))
+
+# Ao limpar, remove entradas até sobrar esta fração do limite
+EVICT_TARGET_FRACTION = 0.9
+
+# Depois de gravar esta fração do limite, o processo verifica o tamanho total
+EVICT_CHECK_FRACTION = 0.05
+
+# Intervalo mínimo entre duas gravações dos contadores de um processo no stats.json
+STATS_FLUSH_SECONDS = float(os.environ.get("REDIMENSIONADOR_DISK_CACHE_FLUSH_S", "5"))
+
+_ENTRY_SUFFIX = ".bin"
+
+
+def make_key(*parts) -> str:
+    """Chave estável a partir de valores simples (str, int, None, tuplas...)."""
+    payload = json.dumps(parts, sort_keys=True, default=repr, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """Cache de bytes em disco com limite de tamanho e remoção LRU."""
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock_path = os.path.join(directory, ".lock")
+        self._stats_path = os.path.join(directory, "stats.json")
+        self._thread_lock = threading.Lock()
+        self._written_since_check = 0
+        # Contadores deste processo; os acumulados de todos os processos ficam em stats.json
+        self.hits = 0
+        self.misses = 0
+        # Contagens ainda não somadas ao stats.json
+        self._pending = {"hits": 0, "misses": 0}
+        self._pending_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        # atexit cobre o processo principal; Finalize, os workers do multiprocessing,
+        # que terminam com os._exit sem rodar o atexit
+        atexit.register(self.flush_stats)
+        multiprocessing.util.Finalize(self, self.flush_stats, exitpriority=10)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + _ENTRY_SUFFIX)
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock, open(self._lock_path, "a+") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _count(self, field: str) -> None:
+        with self._pending_lock:
+            self._pending[field] += 1
+            due = time.monotonic() - self._last_flush >= STATS_FLUSH_SECONDS
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self) -> None:
+        """Soma ao stats.json os acertos/erros contados por este processo desde a última vez."""
+        with self._pending_lock:
+            pending = self._pending
+            self._pending = {"hits": 0, "misses": 0}
+            self._last_flush = time.monotonic()
+        if not any(pending.values()):
+            return
+        try:
+            with self._locked():
+                stats = self._read_stats()
+                for field, count in pending.items():
+                    stats[field] = stats.get(field, 0) + count
+                self._write_atomic(self._stats_path, json.dumps(stats).encode("utf-8"))
+        except OSError:
+            # Diretório removido ou sem permissão: as contagens se perdem, o cache não
+            pass
+
+    def _read_stats(self) -> Dict[str, int]:
+        try:
+            with open(self._stats_path, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except OSError:
+            self.misses += 1
+            self._count("misses")
+            return None
+        try:
+            # Marca como usado recentemente
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        self._count("hits")
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        self._write_atomic(self._path(key), data)
+        self._written_since_check += len(data)
+        if self._written_since_check >= self.max_bytes * EVICT_CHECK_FRACTION:
+            self._written_since_check = 0
+            self.evict()
+
+    def _entries(self):
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(_ENTRY_SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self) -> int:
+        """Remove as entradas usadas há mais tempo até caber no limite; retorna quantas."""
+        with self._locked():
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                return 0
+            target = self.max_bytes * EVICT_TARGET_FRACTION
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            stats = self._read_stats()
+            stats["evictions"] = stats.get("evictions", 0) + removed
+            self._write_atomic(self._stats_path, json.dumps(stats).encode("utf-8"))
+            return removed
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores acumulados de todos os processos e ocupação atual.
+
+        Inclui as contagens deste processo ainda não gravadas; as dos demais
+        processos aparecem a cada ``STATS_FLUSH_SECONDS``.
+        """
+        entries = self._entries()
+        stats = self._read_stats()
+        with self._pending_lock:
+            hits = stats.get("hits", 0) + self._pending["hits"]
+            misses = stats.get("misses", 0) + self._pending["misses"]
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": stats.get("evictions", 0),
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+
+_default_cache: Optional[DiskCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_disk_cache() -> Optional[DiskCache]:
+    """Cache em disco compartilhado, ou ``None`` se desativado (limite 0) ou sem permissão."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None and DEFAULT_CACHE_MB > 0:
+            try:
+                _default_cache = DiskCache()
+            except OSError:
+                return None
+        return _default_cache
@@ -0,0 +1,107 @@
+"""Cache em memória, limitado por bytes, para imagens decodificadas e redimensionadas.
+
+O Streamlit executa o script inteiro a cada interação; este cache permite
+reaproveitar a imagem original decodificada e a imagem escalada entre as
+execuções, de forma que mover os controles de corte execute apenas o
+``crop()``.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+from PIL import Image
+
+# Limite padrão do cache em memória (MB), configurável por variável de ambiente
+DEFAULT_CACHE_MB = int(os.environ.get("REDIMENSIONADOR_CACHE_MB", "256"))
+
+
+def content_hash(data: bytes) -> str:
+    """Hash do conteúdo de um arquivo, usado como chave de cache."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def estimate_nbytes(value) -> int:
+    """Estima quantos bytes um valor ocupa na memória."""
+    if isinstance(value, Image.Image):
+        return value.width * value.height * len(value.getbands())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, tuple):
+        return sum(estimate_nbytes(item) for item in value)
+    return 0
+
+
+class ByteLRUCache:
+    """Cache LRU com limite total de bytes, seguro para várias threads.
+
+    Itens maiores que o limite inteiro não são armazenados.
+    """
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[object], int] = estimate_nbytes):
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key][0]
+
+    def put(self, key: Hashable, value) -> None:
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._items:
+                self.current_bytes -= self._items.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._items[key] = (value, size)
+            self.current_bytes += size
+            # Remover os itens menos usados até caber no limite
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], object]):
+        """Retorna o valor em cache ou calcula, armazena e retorna."""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.current_bytes = 0
+
+
+_default_cache: Optional[ByteLRUCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> ByteLRUCache:
+    """Cache compartilhado do processo, criado sob demanda."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ByteLRUCache(DEFAULT_CACHE_MB * 1024 * 1024)
+        return _default_cache
@@ -0,0 +1,698 @@
+"""Motor de redimensionamento de imagens, independente da interface.
+
+Este módulo concentra os presets de redes sociais, os três métodos de
+redimensionamento (distorcer, cortar e adicionar barras) e a codificação do
+arquivo de saída. Ele depende apenas do Pillow (a geometria, em
+:mod:`layout`, é Python puro), para que possa ser importado por scripts em
+lote e workers sem carregar o Streamlit.
+"""
+
+import io
+import os
+from dataclasses import dataclass, replace
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from layout import (
+    METHOD_CROP,
+    METHOD_DISTORT,
+    METHOD_PAD,
+    METHODS,
+    crop_geometry,
+    crop_limits,
+    group_shared_intermediates,
+    pad_geometry,
+    paste_position,
+    plan_layouts,
+)
+from smart_crop import smart_crop_offsets
+
+# Dicionário com dimensões das redes sociais
+SOCIAL_MEDIA_PRESETS = {
+    "Instagram": {
+        "Feed (Post Quadrado)": (1080, 1080),
+        "Feed (Post Retrato)": (1080, 1350),
+        "Feed (Post Paisagem)": (1080, 566),
+        "Stories": (1080, 1920),
+        "Reels": (1080, 1920),
+        "IGTV/Cover": (1080, 1920),
+        "Perfil": (320, 320)
+    },
+    "Facebook": {
+        "Post no Feed": (1200, 630),
+        "Post Quadrado": (1200, 1200),
+        "Capa": (1640, 859),
+        "Perfil": (400, 400),
+        "Stories": (1080, 1920),
+        "Evento": (1920, 1080)
+    },
+    "Twitter/X": {
+        "Post com Imagem": (1200, 675),
+        "Post Quadrado": (1200, 1200),
+        "Header": (1500, 500),
+        "Perfil": (400, 400)
+    },
+    "LinkedIn": {
+        "Post no Feed": (1200, 627),
+        "Post Quadrado": (1200, 1200),
+        "Capa": (1584, 396),
+        "Perfil": (400, 400),
+        "Banner de Empresa": (1128, 191)
+    },
+    "TikTok": {
+        "Vídeo/Post": (1080, 1920),
+        "Perfil": (200, 200)
+    },
+    "YouTube": {
+        "Thumbnail": (1280, 720),
+        "Banner": (2560, 1440),
+        "Perfil": (800, 800)
+    },
+    "Pinterest": {
+        "Pin Padrão": (1000, 1500),
+        "Pin Quadrado": (1000, 1000),
+        "Pin Longo": (1000, 2100)
+    },
+    "WhatsApp": {
+        "Status": (1080, 1920),
+        "Perfil": (640, 640)
+    }
+}
+
+# Rótulos usados na interface para cada método
+METHOD_LABELS = {
+    "Distorcer": METHOD_DISTORT,
+    "Cortar (Crop)": METHOD_CROP,
+    "Adicionar barras (Padding)": METHOD_PAD,
+}
+
+# Formatos de saída aceitos pelo redimensionador
+RESIZER_OUTPUT_FORMATS = ["JPEG", "PNG", "WEBP"]
+
+# Formatos de saída do conversor
+CONVERTER_OUTPUT_FORMATS = ["JPEG", "PNG", "WEBP", "BMP", "TIFF"]
+
+# Formatos que não suportam transparência
+OPAQUE_FORMATS = ["JPEG", "BMP"]
+
+# Formatos com qualidade configurável
+QUALITY_FORMATS = ["JPEG", "WEBP"]
+
+# Formatos que preservam animações (todos os quadros)
+ANIMATED_FORMATS = ["GIF", "WEBP"]
+
+# Faixa de qualidade explorada quando há um tamanho máximo de arquivo
+TARGET_MIN_QUALITY = 10
+TARGET_MAX_QUALITY = 95
+
+# Codificações em tamanho real feitas na busca por tamanho máximo
+TARGET_FULL_PROBES = 3
+
+# Passo de qualidade entre tentativas em tamanho real, até achar os dois lados do limite
+TARGET_PROBE_STEP = 4
+
+# Tolerância para considerar duas proporções iguais
+RATIO_TOLERANCE = 0.01
+
+# Qualidade do redimensionamento: exata (LANCZOS em resolução total) ou rápida
+QUALITY_EXACT = "exact"
+QUALITY_FAST = "fast"
+QUALITIES = (QUALITY_EXACT, QUALITY_FAST)
+
+# Rótulos usados na interface para cada qualidade
+QUALITY_LABELS = {
+    "Exata": QUALITY_EXACT,
+    "Rápida": QUALITY_FAST,
+}
+
+# Limite de pixels de uma imagem de saída por pedido, configurável por variável de ambiente
+MAX_OUTPUT_PIXELS = int(os.environ.get("REDIMENSIONADOR_MAX_OUTPUT_PIXELS", str(100_000_000)))
+
+# Acima deste tamanho (MB) a saída é gerada em faixas horizontais (ver tiled_resize.py)
+STRIP_THRESHOLD_MB = int(os.environ.get("REDIMENSIONADOR_STRIP_THRESHOLD_MB", "64"))
+
+# Posição padrão do corte: centralizada ou escolhida pelo mapa de bordas (ver smart_crop.py)
+ANCHOR_CENTER = "center"
+ANCHOR_AUTO = "auto"
+ANCHORS = (ANCHOR_CENTER, ANCHOR_AUTO)
+
+# Backend de reamostragem: Pillow (padrão) ou NumPy multi-thread (opcional, ver numpy_resample.py)
+BACKEND_PILLOW = "pillow"
+BACKEND_NUMPY = "numpy"
+BACKENDS = (BACKEND_PILLOW, BACKEND_NUMPY)
+
+# Maior lado das imagens usadas nas prévias da interface
+PREVIEW_MAX_SIDE = 1024
+
+# No modo rápido, reduções maiores que este fator são feitas primeiro com
+# ``Image.reduce``/draft do JPEG e só o restante com LANCZOS
+FAST_REDUCING_GAP = 2.0
+
+
+class ImageBudgetError(ValueError):
+    """O pedido ultrapassa o limite de pixels configurado."""
+
+
+@dataclass(frozen=True)
+class ResizeSpec:
+    """Descreve um redimensionamento: tamanho alvo, método e posição do corte.
+
+    ``offset_x``/``offset_y`` só são usados no método de corte e são medidos
+    na imagem já escalada; ``None`` usa a posição dada por ``anchor``
+    (centralizada ou automática).
+    """
+
+    width: int
+    height: int
+    method: str = METHOD_DISTORT
+    offset_x: Optional[int] = None
+    offset_y: Optional[int] = None
+    quality: str = QUALITY_EXACT
+    backend: str = BACKEND_PILLOW
+    anchor: str = ANCHOR_CENTER
+
+    def __post_init__(self):
+        if self.width < 1 or self.height < 1:
+            raise ValueError(f"Dimensões inválidas: {self.width} x {self.height}")
+        if self.method not in METHODS:
+            raise ValueError(f"Método de redimensionamento desconhecido: {self.method}")
+        if self.quality not in QUALITIES:
+            raise ValueError(f"Qualidade de redimensionamento desconhecida: {self.quality}")
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Backend de reamostragem desconhecido: {self.backend}")
+        if self.anchor not in ANCHORS:
+            raise ValueError(f"Posição de corte desconhecida: {self.anchor}")
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return (self.width, self.height)
+
+
+def output_mode(image_mode: str, spec: ResizeSpec) -> str:
+    """Modo da imagem gerada: o padding sempre produz RGBA."""
+    return 'RGBA' if spec.method == METHOD_PAD else image_mode
+
+
+def output_nbytes(image_mode: str, spec: ResizeSpec) -> int:
+    """Bytes que a imagem de saída ocupa na memória."""
+    return spec.width * spec.height * Image.getmodebands(output_mode(image_mode, spec))
+
+
+def check_output_budget(spec: ResizeSpec, max_pixels: int = MAX_OUTPUT_PIXELS, frames: int = 1) -> None:
+    """Recusa pedidos cuja saída ultrapassa ``max_pixels``.
+
+    Numa animação os codificadores do Pillow guardam todos os quadros antes
+    de gravar, então o limite vale para a soma dos ``frames`` quadros.
+    """
+    if spec.width * spec.height * frames <= max_pixels:
+        return
+    if frames > 1:
+        raise ImageBudgetError(
+            f"A animação de saída ({frames} quadros de {spec.width} x {spec.height}) ultrapassa o limite de "
+            f"{max_pixels:,} pixels por pedido".replace(",", ".")
+        )
+    raise ImageBudgetError(
+        f"A imagem de saída ({spec.width} x {spec.height}) ultrapassa o limite de "
+        f"{max_pixels:,} pixels por pedido".replace(",", ".")
+    )
+
+
+def decode_image(data: bytes, spec: Optional[ResizeSpec] = None) -> Image.Image:
+    """Decodifica os bytes de um arquivo e carrega os pixels na memória.
+
+    Com um ``spec`` no modo rápido, arquivos JPEG são decodificados já
+    reduzidos (modo draft) quando o alvo é bem menor que a imagem.
+    """
+    return decode_for_specs(data, [spec] if spec is not None else [])
+
+
+def decode_for_specs(data: bytes, specs: Sequence[ResizeSpec]) -> Image.Image:
+    """Decodifica uma vez para vários alvos, reduzindo só o que todos permitem."""
+    image = Image.open(io.BytesIO(data))
+    if specs and image.format == "JPEG" and all(spec.quality == QUALITY_FAST for spec in specs):
+        sizes = [intermediate_size(image.size, spec) for spec in specs]
+        needed_width = max(width for width, _ in sizes)
+        needed_height = max(height for _, height in sizes)
+        image.draft(
+            image.mode,
+            (int(needed_width * FAST_REDUCING_GAP), int(needed_height * FAST_REDUCING_GAP))
+        )
+    image.load()
+    return image
+
+
+def get_preset(social: str, preset: str) -> Tuple[int, int]:
+    """Retorna as dimensões ``(largura, altura)`` de um preset."""
+    try:
+        return SOCIAL_MEDIA_PRESETS[social][preset]
+    except KeyError:
+        raise KeyError(f"Preset desconhecido: {social}/{preset}") from None
+
+
+def expand_preset_names(name: str) -> List[Tuple[str, str]]:
+    """Aceita ``"Rede/Tipo"`` ou só ``"Rede"`` (todos os presets da rede)."""
+    if name in SOCIAL_MEDIA_PRESETS:
+        return [(name, preset) for preset in SOCIAL_MEDIA_PRESETS[name]]
+    return [parse_preset_name(name)]
+
+
+def parse_preset_name(name: str) -> Tuple[str, str]:
+    """Separa um nome como ``"Instagram/Stories"`` em ``(rede, preset)``.
+
+    Os nomes de redes e presets podem conter ``/`` (``"Twitter/X"``,
+    ``"IGTV/Cover"``), então a rede é identificada pelo prefixo.
+    """
+    for social in sorted(SOCIAL_MEDIA_PRESETS, key=len, reverse=True):
+        prefix = f"{social}/"
+        if name.startswith(prefix):
+            preset = name[len(prefix):]
+            if preset in SOCIAL_MEDIA_PRESETS[social]:
+                return social, preset
+    raise KeyError(f"Preset desconhecido: {name}")
+
+
+def ratios_differ(source_size: Tuple[int, int], target_size: Tuple[int, int]) -> bool:
+    """Indica se as proporções de origem e destino são diferentes."""
+    original_ratio = source_size[0] / source_size[1]
+    target_ratio = target_size[0] / target_size[1]
+    return abs(original_ratio - target_ratio) > RATIO_TOLERANCE
+
+
+def equivalent_percent(source_size: Tuple[int, int], target_size: Tuple[int, int]) -> int:
+    """Porcentagem do redimensionamento, pela largura (ou pela altura, se só ela muda)."""
+    if target_size[0] != source_size[0]:
+        return int((target_size[0] / source_size[0]) * 100)
+    if target_size[1] != source_size[1]:
+        return int((target_size[1] / source_size[1]) * 100)
+    return 100
+
+
+def resolve_anchor(image: Image.Image, scaled_size: Tuple[int, int], spec: ResizeSpec) -> ResizeSpec:
+    """Preenche o deslocamento do corte automático a partir do conteúdo de ``image``.
+
+    ``image`` pode estar em qualquer resolução; os deslocamentos retornados
+    estão na escala de ``scaled_size``.
+    """
+    if spec.method != METHOD_CROP or spec.anchor != ANCHOR_AUTO:
+        return spec
+    if spec.offset_x is not None and spec.offset_y is not None:
+        return spec
+    auto_x, auto_y = smart_crop_offsets(image, scaled_size, spec.size)
+    return replace(
+        spec,
+        offset_x=auto_x if spec.offset_x is None else spec.offset_x,
+        offset_y=auto_y if spec.offset_y is None else spec.offset_y,
+    )
+
+
+def crop_box(scaled_size: Tuple[int, int], spec: ResizeSpec) -> Tuple[int, int, int, int]:
+    """Retorna a caixa de corte na imagem escalada, respeitando os limites."""
+    max_offset_x, max_offset_y = crop_limits(scaled_size, spec.size)
+
+    left = max_offset_x // 2 if spec.offset_x is None else spec.offset_x
+    top = max_offset_y // 2 if spec.offset_y is None else spec.offset_y
+    left = min(max(0, int(left)), max_offset_x)
+    top = min(max(0, int(top)), max_offset_y)
+    return (left, top, left + spec.width, top + spec.height)
+
+
+def intermediate_size(source_size: Tuple[int, int], spec: ResizeSpec) -> Tuple[int, int]:
+    """Tamanho da imagem escalada antes do corte ou do padding."""
+    if spec.method == METHOD_CROP:
+        return crop_geometry(source_size, spec.size)[:2]
+    if spec.method == METHOD_PAD:
+        return pad_geometry(source_size, spec.size)[:2]
+    return spec.size
+
+
+def resample(image: Image.Image, size: Tuple[int, int], spec: ResizeSpec) -> Image.Image:
+    """Redimensiona com LANCZOS usando o backend e a qualidade do ``spec``."""
+    if spec.backend == BACKEND_NUMPY:
+        from numpy_resample import resize_numpy
+        return resize_numpy(image, size)
+    reducing_gap = FAST_REDUCING_GAP if spec.quality == QUALITY_FAST else None
+    return image.resize(size, Image.Resampling.LANCZOS, reducing_gap=reducing_gap)
+
+
+def scale_intermediate(image: Image.Image, spec: ResizeSpec) -> Image.Image:
+    """Redimensiona a imagem para o tamanho intermediário do método."""
+    return resample(image, intermediate_size(image.size, spec), spec)
+
+
+def compose_from_intermediate(temp_image: Image.Image, spec: ResizeSpec) -> Image.Image:
+    """Aplica o corte ou o padding sobre a imagem já escalada."""
+    if spec.method == METHOD_CROP:
+        spec = resolve_anchor(temp_image, temp_image.size, spec)
+        return temp_image.crop(crop_box(temp_image.size, spec))
+
+    if spec.method == METHOD_PAD:
+        # Converter para RGBA se necessário para suportar transparência
+        if temp_image.mode != 'RGBA':
+            temp_image = temp_image.convert('RGBA')
+
+        # Criar imagem com fundo transparente
+        canvas = Image.new('RGBA', spec.size, (255, 255, 255, 0))
+
+        # Colar a imagem centralizada, mantendo transparência
+        canvas.paste(temp_image, paste_position(temp_image.size, spec.size), temp_image)
+        return canvas
+
+    return temp_image
+
+
+def resize_image(image: Image.Image, spec: ResizeSpec) -> Image.Image:
+    """Redimensiona ``image`` conforme ``spec`` e retorna a nova imagem."""
+    return compose_from_intermediate(scale_intermediate(image, spec), spec)
+
+
+def build_pyramid(image: Image.Image, min_size: Tuple[int, int], gap: float = FAST_REDUCING_GAP):
+    """Gera níveis reduzidos pela metade enquanto continuam ``gap`` vezes maiores que ``min_size``.
+
+    O primeiro nível é a própria imagem. Imagens em paleta (``P``/``1``) não
+    são reduzidas, pois o Pillow não faz média de índices de cor.
+    """
+    levels = [image]
+    while image.mode not in ("1", "P"):
+        level = levels[-1]
+        next_size = (level.width // 2, level.height // 2)
+        if next_size[0] < min_size[0] * gap or next_size[1] < min_size[1] * gap:
+            break
+        levels.append(level.reduce(2))
+    return levels
+
+
+def pick_pyramid_level(levels, needed_size: Tuple[int, int], gap: float = FAST_REDUCING_GAP) -> Image.Image:
+    """Menor nível da pirâmide que ainda é ``gap`` vezes maior que o tamanho pedido."""
+    for level in reversed(levels):
+        if level.width >= needed_size[0] * gap and level.height >= needed_size[1] * gap:
+            return level
+    return levels[0]
+
+
+def render_presets(image: Image.Image, named_specs: Dict[str, ResizeSpec]) -> Dict[str, Image.Image]:
+    """Renderiza vários alvos a partir de um único decode.
+
+    No modo rápido, cada alvo parte do nível da pirâmide mais próximo acima
+    dele; no modo exato, todos partem da imagem original. Alvos que pedem a
+    mesma imagem escalada compartilham um único redimensionamento.
+    """
+    return dict(iter_render_presets(image, named_specs))
+
+
+def iter_render_presets(
+    image: Image.Image, named_specs: Dict[str, ResizeSpec], layouts: Optional[Sequence] = None
+) -> Iterator[Tuple[str, Image.Image]]:
+    """Versão preguiçosa de :func:`render_presets`, que gera um alvo por vez.
+
+    ``layouts`` é a linha de :func:`layout.plan_layouts` para ``image.size``
+    (calculada aqui se omitida). Os alvos saem agrupados pelo intermediário,
+    de modo que só um intermediário fica na memória por vez.
+    """
+    if layouts is None:
+        layouts = plan_layouts([image.size], list(named_specs.values()))[0]
+    groups = group_shared_intermediates(named_specs, layouts)
+
+    fast_sizes = [size for size, quality, _ in groups if quality == QUALITY_FAST]
+    levels = [image]
+    if fast_sizes:
+        min_size = (min(width for width, _ in fast_sizes), min(height for _, height in fast_sizes))
+        levels = build_pyramid(image, min_size)
+
+    for (size, quality, _), names in groups.items():
+        spec = named_specs[names[0]]
+        source = pick_pyramid_level(levels, size) if quality == QUALITY_FAST else image
+        # A geometria é calculada na original para que o resultado não dependa do nível usado
+        temp_image = resample(source, size, replace(spec, quality=QUALITY_EXACT))
+        for name in names:
+            yield name, compose_from_intermediate(temp_image, named_specs[name])
+
+
+def make_proxy(image: Image.Image, max_side: int = PREVIEW_MAX_SIDE) -> Image.Image:
+    """Cópia reduzida da imagem, com maior lado até ``max_side``, para prévias."""
+    if max(image.size) <= max_side:
+        return image
+    scale = max_side / max(image.size)
+    proxy_size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(proxy_size, Image.Resampling.LANCZOS, reducing_gap=FAST_REDUCING_GAP)
+
+
+def decode_proxy(data: bytes, max_side: int = PREVIEW_MAX_SIDE) -> Image.Image:
+    """Decodifica direto para a cópia reduzida de prévia.
+
+    Em JPEG, o decode já é feito reduzido (modo draft) até perto de
+    ``max_side``, sem passar pela imagem inteira; nos demais formatos a
+    imagem é decodificada e depois reduzida.
+    """
+    image = Image.open(io.BytesIO(data))
+    if image.format == "JPEG" and max(image.size) > max_side:
+        scale = max_side / max(image.size)
+        image.draft(image.mode, (round(image.width * scale), round(image.height * scale)))
+    image.load()
+    return make_proxy(image, max_side)
+
+
+def preview_spec(spec: ResizeSpec, max_side: int = PREVIEW_MAX_SIDE) -> ResizeSpec:
+    """Reduz um spec para a escala da prévia, ajustando também o deslocamento do corte."""
+    factor = min(1.0, max_side / max(spec.size))
+    if factor == 1.0:
+        return spec
+
+    def scaled(value):
+        return None if value is None else round(value * factor)
+
+    return replace(
+        spec,
+        width=max(1, round(spec.width * factor)),
+        height=max(1, round(spec.height * factor)),
+        offset_x=scaled(spec.offset_x),
+        offset_y=scaled(spec.offset_y),
+        quality=QUALITY_FAST,
+    )
+
+
+def render_preview(proxy: Image.Image, spec: ResizeSpec, max_side: int = PREVIEW_MAX_SIDE) -> Image.Image:
+    """Renderiza a prévia de ``spec`` a partir do proxy, sem tocar na resolução total."""
+    return resize_image(proxy, preview_spec(spec, max_side))
+
+
+def resolve_save_format(output_format_option: str, original_format: Optional[str], animated: bool = False) -> str:
+    """Escolhe o formato de saída, mantendo o original quando possível.
+
+    Com ``animated``, um GIF original continua GIF para não perder os quadros.
+    """
+    if output_format_option in RESIZER_OUTPUT_FORMATS:
+        return output_format_option
+    if animated and original_format in ANIMATED_FORMATS:
+        return original_format
+    # Manter o formato original, com fallback para PNG
+    return original_format if original_format in RESIZER_OUTPUT_FORMATS else "PNG"
+
+
+def prepare_for_format(image: Image.Image, save_format: str) -> Image.Image:
+    """Ajusta o modo da imagem para formatos sem transparência (ex.: JPEG)."""
+    if save_format in OPAQUE_FORMATS and image.mode in ["RGBA", "LA", "P"]:
+        return image.convert("RGB")
+    return image
+
+
+def encode_image(image: Image.Image, save_format: str, quality: int = 95) -> bytes:
+    """Codifica a imagem no formato pedido e retorna os bytes do arquivo."""
+    save_format = save_format.upper()
+    to_save = prepare_for_format(image, save_format)
+
+    save_kwargs = {}
+    if save_format in QUALITY_FORMATS:
+        save_kwargs["quality"] = int(quality)
+
+    buffer = io.BytesIO()
+    to_save.save(buffer, format=save_format, **save_kwargs)
+    return buffer.getvalue()
+
+
+def _sample_boxes(size: Tuple[int, int], sample_side: int) -> List[Tuple[int, int, int, int]]:
+    """Quatro recortes de até ``sample_side / 2`` de lado, centrados em 1/4 e 3/4 de cada eixo."""
+    width, height = size
+    tile_width = min(width, sample_side) // 2 or 1
+    tile_height = min(height, sample_side) // 2 or 1
+    boxes = []
+    for column, row in [(0, 0), (1, 0), (0, 1), (1, 1)]:
+        left = (width * (1 + 2 * column)) // 4 - tile_width // 2
+        top = (height * (1 + 2 * row)) // 4 - tile_height // 2
+        left = min(max(0, left), width - tile_width)
+        top = min(max(0, top), height - tile_height)
+        boxes.append((left, top, left + tile_width, top + tile_height))
+    return boxes
+
+
+def _mosaic(tiles: List[Image.Image], palette_source: Image.Image) -> Image.Image:
+    """Junta os quatro recortes de :func:`_sample_boxes` em uma imagem 2 x 2."""
+    tile_width, tile_height = tiles[0].size
+    sample = Image.new(tiles[0].mode, (tile_width * 2, tile_height * 2))
+    if sample.mode == "P":
+        sample.putpalette(palette_source.getpalette())
+    for index, tile in enumerate(tiles):
+        sample.paste(tile, ((index % 2) * tile_width, (index // 2) * tile_height))
+    return sample
+
+
+def estimate_encoded_size(
+    image: Image.Image,
+    save_format: str,
+    quality: int = 95,
+    sample_side: int = 256,
+    output_size: Optional[Tuple[int, int]] = None,
+) -> int:
+    """Estima o tamanho do arquivo codificando só uma amostra.
+
+    A amostra é um mosaico de quatro recortes em resolução nativa (reduzir a
+    imagem suavizaria a textura e subestimaria o arquivo). O número de bytes é
+    extrapolado pela razão de pixels até ``output_size`` (por padrão, o tamanho
+    da própria imagem). Para a saída de um redimensionamento, use
+    :func:`estimate_output_size`.
+    """
+    output_size = output_size or image.size
+    sample = image
+    if image.width > sample_side or image.height > sample_side:
+        sample = _mosaic([image.crop(box) for box in _sample_boxes(image.size, sample_side)], image)
+
+    pixel_ratio = (output_size[0] * output_size[1]) / (sample.width * sample.height)
+    return int(len(encode_image(sample, save_format, quality)) * pixel_ratio)
+
+
+def estimate_output_size(
+    image: Image.Image,
+    spec: ResizeSpec,
+    save_format: str,
+    quality: int = 95,
+    sample_side: int = 256,
+) -> int:
+    """Estima o tamanho do arquivo de ``resize_image(image, spec)`` sem gerar a saída inteira.
+
+    Os recortes da amostra são renderizados direto na resolução de saída,
+    cada um com ``resize(box=...)`` só sobre a região correspondente da
+    original, então têm a mesma textura da saída. As barras do padding são
+    transparentes e quase não ocupam espaço, por isso a extrapolação conta só
+    a área da imagem.
+    """
+    if spec.width <= sample_side and spec.height <= sample_side:
+        return len(encode_image(resize_image(image, spec), save_format, quality))
+
+    scaled = intermediate_size(image.size, spec)
+    if spec.method == METHOD_CROP:
+        left, top, _, _ = crop_box(scaled, spec)
+        visible = (spec.width, spec.height)
+    else:
+        left, top = 0, 0
+        visible = scaled
+    scale_x = image.width / scaled[0]
+    scale_y = image.height / scaled[1]
+    reducing_gap = FAST_REDUCING_GAP if spec.quality == QUALITY_FAST else None
+
+    tiles = []
+    for x0, y0, x1, y1 in _sample_boxes(visible, sample_side):
+        source_box = ((left + x0) * scale_x, (top + y0) * scale_y, (left + x1) * scale_x, (top + y1) * scale_y)
+        tile = image.resize((x1 - x0, y1 - y0), Image.Resampling.LANCZOS, box=source_box, reducing_gap=reducing_gap)
+        tiles.append(tile.convert("RGBA") if spec.method == METHOD_PAD and tile.mode != "RGBA" else tile)
+    sample = _mosaic(tiles, image)
+
+    pixel_ratio = (visible[0] * visible[1]) / (sample.width * sample.height)
+    return int(len(encode_image(sample, save_format, quality)) * pixel_ratio)
+
+
+def encode_to_size(
+    image: Image.Image,
+    save_format: str,
+    max_bytes: int,
+    min_quality: int = TARGET_MIN_QUALITY,
+    max_quality: int = TARGET_MAX_QUALITY,
+    full_probes: int = TARGET_FULL_PROBES,
+) -> Tuple[bytes, Optional[int]]:
+    """Codifica com a maior qualidade cujo arquivo cabe em ``max_bytes``.
+
+    Retorna ``(bytes, qualidade)``. A busca binária é feita primeiro sobre a
+    estimativa de :func:`estimate_encoded_size`, que codifica só uma amostra,
+    e só as últimas ``full_probes`` tentativas codificam a imagem inteira,
+    perto da qualidade prevista. Se nem ``min_quality`` couber, devolve essa
+    codificação mesmo assim (o chamador compara o tamanho). Formatos sem
+    qualidade (PNG, BMP...) são codificados uma vez, com qualidade ``None``.
+    """
+    save_format = save_format.upper()
+    if save_format not in QUALITY_FORMATS:
+        return encode_image(image, save_format), None
+
+    # Busca na estimativa: maior qualidade prevista dentro do limite
+    predicted = min_quality
+    low, high = min_quality, max_quality
+    while low <= high:
+        middle = (low + high) // 2
+        if estimate_encoded_size(image, save_format, middle) <= max_bytes:
+            predicted, low = middle, middle + 1
+        else:
+            high = middle - 1
+
+    # Busca em tamanho real, começando pela previsão e restrita à vizinhança dela
+    best: Optional[Tuple[bytes, int]] = None
+    too_big: Optional[Tuple[bytes, int]] = None
+    low, high = min_quality, max_quality
+    quality = predicted
+    for _ in range(max(1, full_probes)):
+        data = encode_image(image, save_format, quality)
+        if len(data) <= max_bytes:
+            best = (data, quality)
+            low = quality + 1
+        else:
+            too_big = (data, quality)
+            high = quality - 1
+        if low > high:
+            break
+        if best is not None and too_big is not None:
+            quality = (low + high + 1) // 2
+        elif best is not None:
+            quality = min(high, quality + TARGET_PROBE_STEP)
+        else:
+            quality = max(low, quality - TARGET_PROBE_STEP)
+
+    if best is not None:
+        return best
+    if too_big[1] == min_quality:
+        return too_big
+    return encode_image(image, save_format, min_quality), min_quality
+
+
+def convert_image_bytes(data: bytes, save_format: str, quality: int = 90, max_bytes: int = 0) -> bytes:
+    """Converte o arquivo para ``save_format`` sem redimensionar.
+
+    Com ``max_bytes``, JPEG/WEBP usam a maior qualidade que cabe no limite.
+    """
+    image = decode_image(data)
+    if max_bytes and save_format.upper() in QUALITY_FORMATS:
+        return encode_to_size(image, save_format, max_bytes)[0]
+    return encode_image(image, save_format, quality=quality)
+
+
+def format_file_size(num_bytes: int) -> str:
+    """Formata um número de bytes para exibição (ex.: ``"1.2 MB"``)."""
+    sign = "-" if num_bytes < 0 else ""
+    size = float(abs(num_bytes))
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024:
+            return f"{sign}{size:.0f} {unit}" if unit == "B" else f"{sign}{size:.1f} {unit}"
+        size /= 1024
+    return f"{sign}{size:.1f} GB"
+
+
+def safe_name(text: str) -> str:
+    """Normaliza um texto para uso em nomes de arquivo."""
+    return text.lower().replace("/", "_").replace(" ", "_")
+
+
+def preset_file_name(social: str, preset: str, size: Tuple[int, int], save_format: str) -> str:
+    """Nome do arquivo de saída para um preset de rede social."""
+    return f"{safe_name(social)}_{safe_name(preset)}_{size[0]}x{size[1]}.{save_format.lower()}"
+
+
+def converted_file_name(original_name: str, save_format: str) -> str:
+    """Nome do arquivo convertido: o nome original com o sufixo ``_convertida``."""
+    base = original_name.rsplit(".", 1)[0]
+    return f"{base}_convertida.{save_format.lower()}"
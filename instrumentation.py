@@ -0,0 +1,161 @@
+"""Medição de tempo e memória por etapa do processamento de cada imagem.
+
+Cada imagem processada ganha um :class:`Trace`; cada etapa (decode,
+redimensionamento, conversão, codificação...) é medida com
+``trace.stage("nome")``. Quando o trace está desligado, ``stage`` devolve um
+objeto vazio compartilhado e o custo é praticamente nulo.
+
+As medições são emitidas como linhas de log em JSON no logger
+``redimensionador.perf`` e acumuladas em contadores que podem ser exportados
+no formato texto do Prometheus com :func:`prometheus_text`.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("redimensionador.perf")
+
+# Liga a instrumentação por padrão (ex.: em workers e no lote)
+ENABLED_BY_DEFAULT = os.environ.get("REDIMENSIONADOR_METRICS", "") == "1"
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = None
+
+
+def current_rss() -> Optional[int]:
+    """Memória residente atual do processo em bytes (só no Linux)."""
+    if _PAGE_SIZE is None:
+        return None
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _NullStage:
+    """Etapa vazia usada quando a instrumentação está desligada."""
+
+    nbytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("trace", "name", "nbytes", "_start", "_rss")
+
+    def __init__(self, trace: "Trace", name: str):
+        self.trace = trace
+        self.name = name
+        # Bytes produzidos pela etapa (ex.: tamanho da imagem gerada), informados por quem mede
+        self.nbytes = 0
+
+    def __enter__(self):
+        self._rss = current_rss()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self._start
+        rss_after = current_rss()
+        rss_delta = rss_after - self._rss if rss_after is not None and self._rss is not None else None
+        self.trace._record(self.name, seconds, self.nbytes, rss_delta)
+        return False
+
+
+class Trace:
+    """Medições das etapas de uma imagem."""
+
+    def __init__(self, label: str = "", enabled: bool = ENABLED_BY_DEFAULT, publish: bool = True):
+        self.label = label
+        self.enabled = enabled
+        # Sem publicar, as etapas só ficam em ``stages`` (ex.: num processo do pool,
+        # cujo resultado é publicado por quem o recebe com :meth:`merge`)
+        self.publish = publish
+        self.stages: List[Dict] = []
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def _record(self, name: str, seconds: float, nbytes: int, rss_delta: Optional[int]) -> None:
+        entry = {"stage": name, "seconds": seconds, "bytes": nbytes, "rss_delta": rss_delta}
+        self.stages.append(entry)
+        if not self.publish:
+            return
+        _registry.observe(name, seconds, nbytes)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"event": "stage", "image": self.label, **entry}))
+
+    def merge(self, stages: List[Dict]) -> None:
+        """Acrescenta etapas medidas em outro processo, como se tivessem sido medidas aqui."""
+        if not self.enabled:
+            return
+        for entry in stages:
+            self._record(entry["stage"], entry["seconds"], entry["bytes"], entry["rss_delta"])
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(entry["seconds"] for entry in self.stages)
+
+
+class _Registry:
+    """Contadores acumulados por etapa, compartilhados pelo processo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seconds = defaultdict(float)
+        self._bytes = defaultdict(int)
+        self._count = defaultdict(int)
+
+    def observe(self, name: str, seconds: float, nbytes: int) -> None:
+        with self._lock:
+            self._seconds[name] += seconds
+            self._bytes[name] += nbytes
+            self._count[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._seconds), dict(self._bytes), dict(self._count)
+
+
+_registry = _Registry()
+
+
+def prometheus_text() -> str:
+    """Contadores acumulados no formato de exposição em texto do Prometheus."""
+    seconds, nbytes, count = _registry.snapshot()
+    lines = [
+        "# HELP redimensionador_stage_seconds_total Tempo total gasto em cada etapa.",
+        "# TYPE redimensionador_stage_seconds_total counter",
+    ]
+    lines += [f'redimensionador_stage_seconds_total{{stage="{name}"}} {value:.6f}' for name, value in sorted(seconds.items())]
+    lines += [
+        "# HELP redimensionador_stage_bytes_total Bytes produzidos em cada etapa.",
+        "# TYPE redimensionador_stage_bytes_total counter",
+    ]
+    lines += [f'redimensionador_stage_bytes_total{{stage="{name}"}} {value}' for name, value in sorted(nbytes.items())]
+    lines += [
+        "# HELP redimensionador_stage_runs_total Execuções de cada etapa.",
+        "# TYPE redimensionador_stage_runs_total counter",
+    ]
+    lines += [f'redimensionador_stage_runs_total{{stage="{name}"}} {value}' for name, value in sorted(count.items())]
+    return "\n".join(lines) + "\n"
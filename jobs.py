@@ -0,0 +1,285 @@
+"""Fila de trabalhos pesados executados em processos separados.
+
+No Streamlit, tudo que roda dentro do script bloqueia a sessão até terminar,
+e cada interação espera a anterior. Aqui os trabalhos pesados (resolução
+total, codificação, conversão) são enviados a um pool de processos e
+identificados por um ID; o script só consulta o estado a cada execução.
+
+- Cada trabalho pode ter uma chave (ex.: sessão + "download"). Enviar outro
+  com a mesma chave cancela o anterior: se ainda estava na fila, ele nem
+  começa; se já estava rodando, para no próximo ``check_cancelled`` e o
+  resultado é descartado.
+- O progresso e os pedidos de cancelamento passam por dicionários de um
+  ``multiprocessing.Manager``, visíveis pelos processos do pool.
+- O número de processos (concorrência por servidor) vem de
+  ``REDIMENSIONADOR_JOB_WORKERS``.
+- Um resultado terminado fica guardado até ser lido (``result``/``forget``)
+  ou, se ninguém o ler (ex.: sessão fechada), por ``JOB_RESULT_TTL_SECONDS``.
+- As etapas medidas dentro do processo do pool voltam junto com o resultado
+  e são somadas à instrumentação (:mod:`instrumentation`) de quem o lê.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional
+
+from animation import encode_animation
+from image_engine import decode_image, encode_image, encode_to_size
+from instrumentation import Trace
+from probe import check_input_budget, probe_image
+from tiled_resize import resize_bounded
+
+DEFAULT_JOB_WORKERS = int(os.environ.get("REDIMENSIONADOR_JOB_WORKERS", str(os.cpu_count() or 1)))
+
+# Segundos que um resultado terminado e nunca lido (ex.: sessão fechada) é mantido antes de ser descartado
+JOB_RESULT_TTL_SECONDS = float(os.environ.get("REDIMENSIONADOR_JOB_RESULT_TTL_S", "600"))
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    """Levantada dentro do trabalho quando ele foi cancelado ou substituído."""
+
+
+class JobStatus(NamedTuple):
+    """Estado de um trabalho: ``state``, fração concluída e etapa ou mensagem de erro."""
+
+    state: str
+    progress: float
+    message: str
+
+
+class JobContext:
+    """Passado como primeiro argumento ao trabalho, para informar progresso e ver cancelamentos."""
+
+    def __init__(self, job_id: str, progress, cancelled):
+        self.job_id = job_id
+        self._progress = progress
+        self._cancelled = cancelled
+        # Etapas medidas com ``context.trace.stage(...)``, devolvidas com o resultado
+        self.trace = Trace(label=job_id, enabled=True, publish=False)
+
+    def report(self, done: int, total: int, stage: str = "") -> None:
+        self._progress[self.job_id] = (done, total, stage)
+
+    def check_cancelled(self) -> None:
+        if self._cancelled.get(self.job_id):
+            raise JobCancelled(self.job_id)
+
+
+def _run_job(func: Callable, job_id: str, progress, cancelled, args, kwargs):
+    context = JobContext(job_id, progress, cancelled)
+    context.check_cancelled()
+    return func(context, *args, **kwargs), context.trace.stages
+
+
+def _mark_finished(future: Future) -> None:
+    future.finished_at = time.monotonic()
+
+
+def _warm_up() -> None:
+    # Carrega os plugins do Pillow uma vez por processo, antes do primeiro trabalho
+    from PIL import Image
+    Image.init()
+
+
+class JobQueue:
+    """Pool de processos com IDs de trabalho, substituição por chave e progresso."""
+
+    def __init__(self, max_workers: int = DEFAULT_JOB_WORKERS):
+        # O servidor do Streamlit tem várias threads; "spawn" evita copiar travas em uso com fork
+        context = multiprocessing.get_context("spawn")
+        self.max_workers = max(1, max_workers)
+        self._manager = context.Manager()
+        self._progress = self._manager.dict()
+        self._cancelled = self._manager.dict()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=context, initializer=_warm_up
+        )
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        self._keys: Dict[Hashable, str] = {}
+
+    def submit(self, func: Callable, *args, key: Optional[Hashable] = None, **kwargs) -> str:
+        """Enfileira ``func(contexto, *args, **kwargs)`` e retorna o ID do trabalho.
+
+        ``func`` precisa ser uma função de módulo (enviada aos processos por
+        pickle). Um trabalho anterior com a mesma ``key`` é cancelado.
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            previous = self._keys.get(key) if key is not None else None
+            future = self._executor.submit(
+                _run_job, func, job_id, self._progress, self._cancelled, args, kwargs
+            )
+            future.add_done_callback(_mark_finished)
+            self._futures[job_id] = future
+            if key is not None:
+                self._keys[key] = job_id
+            self._prune_expired()
+        if previous is not None:
+            self.cancel(previous)
+        return job_id
+
+    def _prune_expired(self) -> None:
+        # Só descarta resultados que ninguém leu por mais que o TTL; os demais esperam o dono
+        deadline = time.monotonic() - JOB_RESULT_TTL_SECONDS
+        expired = [
+            job_id for job_id, future in self._futures.items()
+            if future.done() and getattr(future, "finished_at", deadline + 1) <= deadline
+        ]
+        for job_id in expired:
+            del self._futures[job_id]
+        if expired:
+            self._keys = {key: value for key, value in self._keys.items() if value in self._futures}
+
+    def cancel(self, job_id: str) -> None:
+        """Cancela o trabalho; o que ainda está na fila não chega a começar."""
+        with self._lock:
+            future = self._futures.pop(job_id, None)
+            self._keys = {key: value for key, value in self._keys.items() if value != job_id}
+        if future is None:
+            return
+        if future.cancel():
+            self._progress.pop(job_id, None)
+            return
+        # Já em execução: o trabalho para no próximo ponto de verificação
+        self._cancelled[job_id] = True
+        future.add_done_callback(lambda _: self._clear_shared(job_id))
+
+    def _clear_shared(self, job_id: str) -> None:
+        try:
+            self._progress.pop(job_id, None)
+            self._cancelled.pop(job_id, None)
+        except (OSError, EOFError):
+            # Manager já encerrado no desligamento
+            pass
+
+    def status(self, job_id: str) -> JobStatus:
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is None or future.cancelled():
+            return JobStatus(JOB_CANCELLED, 0.0, "")
+        if future.done():
+            error = future.exception()
+            if isinstance(error, JobCancelled):
+                return JobStatus(JOB_CANCELLED, 0.0, "")
+            if error is not None:
+                return JobStatus(JOB_FAILED, 1.0, str(error))
+            return JobStatus(JOB_DONE, 1.0, "")
+        if not future.running():
+            return JobStatus(JOB_PENDING, 0.0, "")
+        done, total, stage = self._progress.get(job_id, (0, 1, ""))
+        return JobStatus(JOB_RUNNING, done / total if total else 0.0, stage)
+
+    def result(self, job_id: str, trace: Optional[Trace] = None) -> Any:
+        """Resultado de um trabalho concluído; o trabalho é esquecido em seguida.
+
+        As etapas medidas no processo do pool são somadas a ``trace`` ou, sem
+        ele, aos contadores do processo quando a instrumentação está ligada.
+        """
+        with self._lock:
+            future = self._futures.pop(job_id)
+            self._keys = {key: value for key, value in self._keys.items() if value != job_id}
+        self._clear_shared(job_id)
+        try:
+            value, stages = future.result(timeout=0)
+        except CancelledError:
+            raise JobCancelled(job_id) from None
+        (trace if trace is not None else Trace(label=job_id)).merge(stages)
+        return value
+
+    def forget(self, job_id: str) -> None:
+        """Descarta um trabalho terminado (com erro, por exemplo) sem ler o resultado."""
+        with self._lock:
+            self._futures.pop(job_id, None)
+            self._keys = {key: value for key, value in self._keys.items() if value != job_id}
+        self._clear_shared(job_id)
+
+    def active_count(self) -> int:
+        """Trabalhos ainda na fila ou em execução."""
+        with self._lock:
+            return sum(1 for future in self._futures.values() if not future.done())
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
+
+
+_default_queue: Optional[JobQueue] = None
+_default_lock = threading.Lock()
+
+
+def get_default_job_queue() -> Optional[JobQueue]:
+    """Fila compartilhada por todas as sessões do servidor, ou ``None`` se desativada (0 processos)."""
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None and DEFAULT_JOB_WORKERS > 0:
+            _default_queue = JobQueue()
+        return _default_queue
+
+
+# Trabalhos usados pela interface. Recebem os bytes do arquivo, e não a
+# imagem decodificada, para que só os bytes atravessem para o processo.
+
+def render_job(
+    context: JobContext,
+    data: bytes,
+    spec,
+    save_format: str,
+    quality: int = 95,
+    max_bytes: int = 0,
+    animated: bool = False,
+) -> bytes:
+    """Redimensiona em resolução total e codifica, com três etapas de progresso."""
+    check_input_budget(probe_image(data))
+    if animated:
+        context.report(0, 1, "animation")
+        with context.trace.stage("animation") as stage:
+            encoded = encode_animation(data, spec, save_format, quality=quality)
+            stage.nbytes = len(encoded)
+        return encoded
+
+    context.report(0, 3, "decode")
+    with context.trace.stage("decode"):
+        image = decode_image(data, spec)
+    context.check_cancelled()
+    context.report(1, 3, "resize")
+    with context.trace.stage("resize"):
+        resized = resize_bounded(image, spec)
+    context.check_cancelled()
+    context.report(2, 3, "encode")
+    with context.trace.stage("encode") as stage:
+        if max_bytes:
+            encoded, _ = encode_to_size(resized, save_format, max_bytes)
+        else:
+            encoded = encode_image(resized, save_format, quality=quality)
+        stage.nbytes = len(encoded)
+    context.report(3, 3, "done")
+    return encoded
+
+
+def convert_job(context: JobContext, data: bytes, save_format: str, quality: int = 90, max_bytes: int = 0) -> bytes:
+    """Converte o formato sem redimensionar."""
+    check_input_budget(probe_image(data))
+    context.report(0, 2, "decode")
+    with context.trace.stage("decode"):
+        image = decode_image(data)
+    context.check_cancelled()
+    context.report(1, 2, "encode")
+    with context.trace.stage("encode") as stage:
+        if max_bytes:
+            encoded, _ = encode_to_size(image, save_format, max_bytes)
+        else:
+            encoded = encode_image(image, save_format, quality=quality)
+        stage.nbytes = len(encoded)
+    context.report(2, 2, "done")
+    return encoded
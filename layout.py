@@ -0,0 +1,181 @@
+"""Geometria de corte e padding de uma ou muitas imagens para muitos alvos.
+
+Aqui ficam as contas de geometria dos três métodos (tamanho escalado,
+limites do corte, posição do padding), usadas por :mod:`image_engine`, que
+as reexporta. Este módulo não depende do Pillow nem do motor.
+
+O lote aplica vários presets a cada imagem, e presets diferentes muitas
+vezes pedem a mesma imagem escalada (tamanhos repetidos entre redes, ou
+alvos que levam à mesma escala). :func:`plan_layouts` calcula a geometria
+de todas as combinações origem × alvo numa única passada vetorizada com
+NumPy, com os mesmos resultados de :func:`crop_geometry` e
+:func:`pad_geometry`. Depois os alvos são agrupados pelo intermediário que
+compartilham, e :func:`image_engine.iter_render_presets` redimensiona cada
+grupo uma única vez.
+
+O NumPy é opcional e só é importado na primeira passada com muitas
+origens (o plano do lote); para uma imagem, ou sem NumPy, a mesma tabela é
+calculada em Python puro, que nesse tamanho é mais rápido.
+"""
+
+from typing import TYPE_CHECKING, Dict, Hashable, List, NamedTuple, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from image_engine import ResizeSpec
+
+# A partir de quantas origens a tabela é calculada com NumPy; abaixo disso,
+# importar o NumPy custa mais que as contas em Python puro
+VECTORIZE_MIN_SOURCES = 8
+
+# Métodos de redimensionamento
+METHOD_DISTORT = "distort"
+METHOD_CROP = "crop"
+METHOD_PAD = "pad"
+METHODS = (METHOD_DISTORT, METHOD_CROP, METHOD_PAD)
+
+
+def fit_size(source_size: Tuple[int, int], target_size: Tuple[int, int], cover: bool) -> Tuple[int, int]:
+    """Tamanho da origem escalada mantendo a proporção.
+
+    Com ``cover``, preenche o alvo (corte); sem, cabe nele (padding).
+    """
+    width, height = source_size
+    new_width, new_height = target_size
+    scale_x, scale_y = new_width / width, new_height / height
+    scale = max(scale_x, scale_y) if cover else min(scale_x, scale_y)
+    return int(width * scale), int(height * scale)
+
+
+def crop_limits(scaled: Tuple[int, int], target_size: Tuple[int, int]) -> Tuple[int, int]:
+    """Deslocamentos máximos do corte dentro da imagem escalada."""
+    return max(0, scaled[0] - target_size[0]), max(0, scaled[1] - target_size[1])
+
+
+def paste_position(scaled: Tuple[int, int], target_size: Tuple[int, int]) -> Tuple[int, int]:
+    """Posição que centraliza a imagem escalada no padding."""
+    return (target_size[0] - scaled[0]) // 2, (target_size[1] - scaled[1]) // 2
+
+
+def crop_geometry(source_size: Tuple[int, int], target_size: Tuple[int, int]):
+    """Calcula o tamanho escalado e os limites de deslocamento do corte.
+
+    Retorna ``(scaled_width, scaled_height, max_offset_x, max_offset_y)``.
+    """
+    scaled = fit_size(source_size, target_size, cover=True)
+    return scaled + crop_limits(scaled, target_size)
+
+
+def pad_geometry(source_size: Tuple[int, int], target_size: Tuple[int, int]):
+    """Calcula o tamanho escalado e a posição de colagem do padding.
+
+    Retorna ``(scaled_width, scaled_height, paste_x, paste_y)``.
+    """
+    scaled = fit_size(source_size, target_size, cover=False)
+    return scaled + paste_position(scaled, target_size)
+
+
+class Layout(NamedTuple):
+    """Geometria de um alvo para uma origem.
+
+    ``x``/``y`` são os deslocamentos máximos do corte (método de corte), a
+    posição de colagem (padding) ou zero (distorcer).
+    """
+
+    scaled_width: int
+    scaled_height: int
+    x: int
+    y: int
+
+    @property
+    def scaled_size(self) -> Tuple[int, int]:
+        return (self.scaled_width, self.scaled_height)
+
+
+def _numpy():
+    """Módulo NumPy, importado na primeira chamada; ``None`` se não está instalado."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _geometry_numpy(source_sizes: Sequence[Tuple[int, int]], target_sizes: Sequence[Tuple[int, int]], method: str):
+    """Tabela ``(origens, alvos, 4)`` com as mesmas contas (em float64) das funções escalares."""
+    np = _numpy()
+    sources = np.asarray(source_sizes, dtype=np.int64).reshape(-1, 1, 2)
+    targets = np.asarray(target_sizes, dtype=np.int64).reshape(1, -1, 2)
+    shape = (sources.shape[0], targets.shape[1], 2)
+
+    if method == METHOD_CROP or method == METHOD_PAD:
+        ratios = targets / sources
+        scale = ratios.max(axis=2) if method == METHOD_CROP else ratios.min(axis=2)
+        # astype trunca, como o int() das funções escalares
+        scaled = (sources * scale[..., np.newaxis]).astype(np.int64)
+        if method == METHOD_CROP:
+            offsets = np.maximum(scaled - targets, 0)
+        else:
+            offsets = (targets - scaled) // 2
+    else:
+        scaled = np.broadcast_to(targets, shape)
+        offsets = np.zeros(shape, dtype=np.int64)
+    return np.concatenate([scaled, offsets], axis=2).tolist()
+
+
+def _geometry_python(source_sizes: Sequence[Tuple[int, int]], target_sizes: Sequence[Tuple[int, int]], method: str):
+    geometry = {METHOD_CROP: crop_geometry, METHOD_PAD: pad_geometry}.get(method)
+    return [
+        [geometry(source, target) if geometry else tuple(target) + (0, 0) for target in target_sizes]
+        for source in source_sizes
+    ]
+
+
+def plan_layouts(source_sizes: Sequence[Tuple[int, int]], specs: Sequence["ResizeSpec"]) -> List[List[Layout]]:
+    """Geometria de cada alvo para cada origem: ``plan[origem][alvo]``.
+
+    Os alvos são separados por método e cada método é calculado para todas
+    as origens de uma vez, com NumPy a partir de ``VECTORIZE_MIN_SOURCES``.
+    """
+    specs = list(specs)
+    plan: List[List[Layout]] = [[None] * len(specs) for _ in source_sizes]
+    if not source_sizes:
+        return plan
+
+    indices_by_method: Dict[str, List[int]] = {}
+    for index, spec in enumerate(specs):
+        indices_by_method.setdefault(spec.method, []).append(index)
+
+    vectorize = len(source_sizes) >= VECTORIZE_MIN_SOURCES and _numpy() is not None
+    geometry = _geometry_numpy if vectorize else _geometry_python
+    for method, indices in indices_by_method.items():
+        table = geometry(source_sizes, [specs[index].size for index in indices], method)
+        for row, layouts in zip(plan, table):
+            for index, values in zip(indices, layouts):
+                row[index] = Layout(*values)
+    return plan
+
+
+def intermediate_key(spec: "ResizeSpec", layout: Layout) -> Tuple:
+    """Alvos com a mesma chave podem partir da mesma imagem escalada."""
+    return (layout.scaled_size, spec.quality, spec.backend)
+
+
+def group_shared_intermediates(
+    named_specs: Dict[Hashable, "ResizeSpec"], layouts: Sequence[Layout]
+) -> Dict[Tuple, List[Hashable]]:
+    """Agrupa os nomes dos alvos pelo intermediário, na ordem em que aparecem."""
+    groups: Dict[Tuple, List[Hashable]] = {}
+    for (name, spec), layout in zip(named_specs.items(), layouts):
+        groups.setdefault(intermediate_key(spec, layout), []).append(name)
+    return groups
+
+
+def plan_summary(source_sizes: Sequence[Tuple[int, int]], specs: Sequence["ResizeSpec"]) -> Tuple[int, int]:
+    """Quantos alvos serão gerados e quantos redimensionamentos eles exigem."""
+    specs = list(specs)
+    named_specs = dict(enumerate(specs))
+    resizes = sum(
+        len(group_shared_intermediates(named_specs, layouts))
+        for layouts in plan_layouts(source_sizes, specs)
+    )
+    return len(source_sizes) * len(specs), resizes
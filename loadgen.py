@@ -0,0 +1,130 @@
+"""Gerador de carga para a API HTTP local (``api_server.py``).
+
+Cada cliente mantém uma conexão keep-alive e envia pedidos em sequência;
+vários clientes rodam em threads. No fim, informa pedidos/s, latência
+p50/p95/p99 e a contagem por status HTTP (503 indica fila cheia).
+
+Exemplo::
+
+    python loadgen.py -c 16 -n 400 --size 3000x2000 \\
+        --path "/resize?preset=Instagram/Stories&method=crop&format=webp"
+"""
+
+import argparse
+import http.client
+import io
+import json
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+from benchmark import parse_size, percentile, synthetic_image
+
+DEFAULT_URL = "http://127.0.0.1:8000"
+DEFAULT_PATH = "/resize?preset=Instagram/Stories&method=crop&format=jpeg"
+
+
+def run_client(
+    url: str,
+    path: str,
+    body: bytes,
+    requests: int,
+    latencies: List[float],
+    statuses: Counter,
+    lock: threading.Lock,
+    timeout: float,
+) -> None:
+    """Envia ``requests`` pedidos por uma conexão keep-alive, reabrindo-a se cair."""
+    parts = urlsplit(url)
+    connection = None
+    for _ in range(requests):
+        if connection is None:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+        start = time.perf_counter()
+        try:
+            connection.request("POST", path, body=body, headers={"Content-Type": "application/octet-stream"})
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+            if response.getheader("Connection", "").lower() == "close":
+                connection.close()
+                connection = None
+        except (OSError, http.client.HTTPException) as e:
+            status = type(e).__name__
+            connection.close()
+            connection = None
+        elapsed = time.perf_counter() - start
+        with lock:
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(elapsed)
+    if connection is not None:
+        connection.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Gerador de carga para a API de redimensionamento.")
+    parser.add_argument("--url", default=DEFAULT_URL, help="Endereço do servidor")
+    parser.add_argument("--path", default=DEFAULT_PATH, help="Rota e parâmetros de cada pedido")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="Clientes simultâneos")
+    parser.add_argument("-n", "--requests", type=int, default=200, help="Total de pedidos")
+    parser.add_argument("--size", default="1920x1080", help="Tamanho da imagem sintética enviada (LxA)")
+    parser.add_argument("--format", default="JPEG", help="Formato da imagem enviada")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Tempo máximo por pedido (s)")
+    parser.add_argument("-o", "--output", help="Grava o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    buffer = io.BytesIO()
+    synthetic_image(parse_size(args.size), "RGB").save(buffer, format=args.format)
+    body = buffer.getvalue()
+
+    concurrency = max(1, args.concurrency)
+    per_client = [args.requests // concurrency + (1 if i < args.requests % concurrency else 0) for i in range(concurrency)]
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(
+            target=run_client,
+            args=(args.url, args.path, body, count, latencies, statuses, lock, args.timeout),
+        )
+        for count in per_client if count
+    ]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        "requests": sum(statuses.values()),
+        "seconds": elapsed,
+        "requests_per_s": sum(statuses.values()) / elapsed if elapsed else None,
+        "ok_per_s": statuses[200] / elapsed if elapsed else None,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+        "p95_ms": percentile(latencies, 0.95) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else None,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+    print(
+        f"{summary['requests']} pedidos em {elapsed:.1f}s: {summary['requests_per_s']:.1f} pedidos/s "
+        f"({summary['ok_per_s']:.1f} com sucesso/s)"
+    )
+    if latencies:
+        print(f"latência (200): p50={summary['p50_ms']:.1f}ms p95={summary['p95_ms']:.1f}ms p99={summary['p99_ms']:.1f}ms")
+    print("status: " + ", ".join(f"{status}={count}" for status, count in summary["statuses"].items()))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(summary, file, indent=2)
+    return 0 if statuses[200] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Leitura só do cabeçalho da imagem, antes de qualquer decode.
+
+O ``Image.open`` do Pillow é preguiçoso: lê o cabeçalho (dimensões, modo,
+EXIF, perfil ICC) e só decodifica os pixels no ``load``. Com isso dá para
+recusar arquivos grandes demais (ou "bombas" de descompressão), escolher a
+estratégia de decode e mostrar as informações do arquivo em tempo
+proporcional ao cabeçalho, e não aos pixels.
+"""
+
+import io
+import os
+import warnings
+from typing import NamedTuple, Optional
+
+from PIL import Image
+
+from image_engine import (
+    FAST_REDUCING_GAP,
+    QUALITY_FAST,
+    STRIP_THRESHOLD_MB,
+    ImageBudgetError,
+    ResizeSpec,
+    format_file_size,
+    intermediate_size,
+    output_nbytes,
+)
+
+# Maior imagem de entrada aceita, em pixels por quadro
+MAX_INPUT_PIXELS = int(os.environ.get("REDIMENSIONADOR_MAX_INPUT_PIXELS", str(Image.MAX_IMAGE_PIXELS)))
+
+# Maior total de pixels somando todos os quadros de uma animação
+MAX_ANIMATION_PIXELS = int(os.environ.get("REDIMENSIONADOR_MAX_ANIMATION_PIXELS", str(MAX_INPUT_PIXELS * 4)))
+
+# Tag EXIF de orientação
+EXIF_ORIENTATION = 0x0112
+
+# Reduções que o decode JPEG consegue fazer direto (escala 1/n)
+JPEG_DRAFT_SCALES = (8, 4, 2)
+
+
+class ImageProbe(NamedTuple):
+    """Informações do cabeçalho de um arquivo de imagem."""
+
+    format: str
+    width: int
+    height: int
+    mode: str
+    frames: int
+    orientation: int
+    icc_bytes: int
+    file_bytes: int
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    @property
+    def megapixels(self) -> float:
+        return self.width * self.height / 1e6
+
+    @property
+    def animated(self) -> bool:
+        return self.frames > 1
+
+    @property
+    def decoded_nbytes(self) -> int:
+        """Memória que o primeiro quadro ocupa depois de decodificado."""
+        return self.width * self.height * Image.getmodebands(self.mode)
+
+
+class DecodePlan(NamedTuple):
+    """Como decodificar e processar o arquivo para um pedido."""
+
+    draft_scale: int
+    strips: bool
+    animated: bool
+    # Memória de um quadro decodificado, já com a redução do JPEG
+    decoded_nbytes: int = 0
+
+    def describe(self) -> str:
+        parts = []
+        if self.animated:
+            parts.append("todos os quadros")
+        if self.draft_scale > 1:
+            parts.append(f"decode JPEG reduzido (1/{self.draft_scale})")
+        if self.strips:
+            parts.append("saída em faixas")
+        text = ", ".join(parts) or "decode completo"
+        if self.decoded_nbytes:
+            text += f" ({format_file_size(self.decoded_nbytes)} decodificados)"
+        return text
+
+
+def probe_image(data: bytes) -> ImageProbe:
+    """Lê só o cabeçalho dos bytes de um arquivo.
+
+    Arquivos acima do limite do próprio Pillow levantam
+    :class:`ImageBudgetError` em vez de ``DecompressionBombError``.
+    """
+    try:
+        with warnings.catch_warnings():
+            # O aviso de "bomba" é substituído pelos limites deste módulo
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            with Image.open(io.BytesIO(data)) as image:
+                exif = image.getexif()
+                return ImageProbe(
+                    format=image.format or "",
+                    width=image.width,
+                    height=image.height,
+                    mode=image.mode,
+                    frames=getattr(image, "n_frames", 1),
+                    orientation=int(exif.get(EXIF_ORIENTATION, 1) or 1),
+                    icc_bytes=len(image.info.get("icc_profile") or b""),
+                    file_bytes=len(data),
+                )
+    except Image.DecompressionBombError as e:
+        raise ImageBudgetError(str(e)) from None
+
+
+def check_input_budget(
+    probe: ImageProbe,
+    max_pixels: int = MAX_INPUT_PIXELS,
+    max_animation_pixels: int = MAX_ANIMATION_PIXELS,
+) -> None:
+    """Recusa imagens de entrada acima dos limites, antes de decodificar."""
+    pixels = probe.width * probe.height
+    if pixels > max_pixels:
+        raise ImageBudgetError(
+            f"A imagem enviada ({probe.width} x {probe.height}) ultrapassa o limite de "
+            f"{max_pixels:,} pixels".replace(",", ".")
+        )
+    if probe.animated and pixels * probe.frames > max_animation_pixels:
+        raise ImageBudgetError(
+            f"A animação ({probe.frames} quadros de {probe.width} x {probe.height}) ultrapassa o limite de "
+            f"{max_animation_pixels:,} pixels no total".replace(",", ".")
+        )
+
+
+def plan_decode(probe: ImageProbe, spec: Optional[ResizeSpec] = None) -> DecodePlan:
+    """Escolhe a estratégia de decode a partir do cabeçalho.
+
+    Segue as mesmas regras de :func:`image_engine.decode_for_specs` (JPEG
+    reduzido só no modo rápido) e de :func:`tiled_resize.needs_strips`.
+    """
+    if spec is None:
+        return DecodePlan(1, False, probe.animated, probe.decoded_nbytes)
+
+    draft_scale = 1
+    if probe.format == "JPEG" and spec.quality == QUALITY_FAST and not probe.animated:
+        needed_width, needed_height = intermediate_size(probe.size, spec)
+        for scale in JPEG_DRAFT_SCALES:
+            if (
+                probe.width // scale >= needed_width * FAST_REDUCING_GAP
+                and probe.height // scale >= needed_height * FAST_REDUCING_GAP
+            ):
+                draft_scale = scale
+                break
+
+    strips = not probe.animated and output_nbytes(probe.mode, spec) > STRIP_THRESHOLD_MB * 1024 * 1024
+    return DecodePlan(draft_scale, strips, probe.animated, probe.decoded_nbytes // (draft_scale * draft_scale))
@@ -0,0 +1,54 @@
+import io
+
+import pytest
+from PIL import Image
+
+from animation import encode_animation
+from image_engine import ImageBudgetError, ResizeSpec
+
+COLORS = ["red", "green", "blue", "yellow"]
+DURATIONS = [100, 200, 300, 400]
+DISPOSALS = [2, 1, 2, 1]
+
+
+def animated_gif(frames=len(COLORS), size=(80, 60)):
+    images = [Image.new("RGB", size, COLORS[index % len(COLORS)]) for index in range(frames)]
+    buffer = io.BytesIO()
+    images[0].save(
+        buffer, format="GIF", save_all=True, append_images=images[1:],
+        duration=[DURATIONS[index % len(DURATIONS)] for index in range(frames)],
+        disposal=[DISPOSALS[index % len(DISPOSALS)] for index in range(frames)],
+        loop=3,
+    )
+    return buffer.getvalue()
+
+
+def read_frames(data):
+    with Image.open(io.BytesIO(data)) as image:
+        frames = []
+        for index in range(image.n_frames):
+            image.seek(index)
+            image.load()
+            frames.append((image.size, image.info.get("duration"), getattr(image, "disposal_method", None)))
+        return frames, image.info.get("loop")
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_gif_round_trip_keeps_timing_loop_and_disposal(workers):
+    encoded = encode_animation(animated_gif(), ResizeSpec(40, 30), "GIF", workers=workers)
+    frames, loop = read_frames(encoded)
+    assert frames == [((40, 30), duration, disposal) for duration, disposal in zip(DURATIONS, DISPOSALS)]
+    assert loop == 3
+
+
+def test_webp_round_trip_keeps_timing_and_loop():
+    encoded = encode_animation(animated_gif(), ResizeSpec(40, 30, method="crop"), "WEBP", quality=90)
+    frames, loop = read_frames(encoded)
+    assert [(size, duration) for size, duration, _ in frames] == [((40, 30), duration) for duration in DURATIONS]
+    assert loop == 3
+
+
+def test_budget_counts_every_output_frame():
+    # Cada quadro cabe no limite, mas o codificador guardaria todos: 50 x 1500 x 1500 > 100 milhões
+    with pytest.raises(ImageBudgetError, match="50 quadros"):
+        encode_animation(animated_gif(frames=50), ResizeSpec(1500, 1500), "GIF")
@@ -0,0 +1,39 @@
+import time
+from http import HTTPStatus
+
+import pytest
+
+from api_server import RequestError, ResizeServer
+
+
+@pytest.fixture
+def server():
+    resize_server = ResizeServer(
+        ("127.0.0.1", 0), workers=1, max_request_bytes=1024, max_pending=1, request_timeout=0.2, quiet=True
+    )
+    yield resize_server
+    resize_server.server_close()
+
+
+def test_timed_out_task_keeps_its_slot_until_it_finishes(server):
+    with pytest.raises(RequestError) as timeout:
+        server.run(time.sleep, 1.0)
+    assert timeout.value.status == HTTPStatus.GATEWAY_TIMEOUT
+
+    # O processo ainda está no sleep: a fila continua cheia
+    with pytest.raises(RequestError) as busy:
+        server.run(abs, -1)
+    assert busy.value.status == HTTPStatus.SERVICE_UNAVAILABLE
+    assert server.in_flight == 1
+
+    deadline = time.monotonic() + 10
+    while server.in_flight and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert server.run(abs, -1) == 1
+    assert server.in_flight == 0
+
+
+def test_failed_task_releases_its_slot(server):
+    with pytest.raises(TypeError):
+        server.run(abs, "x")
+    assert server.run(abs, -2) == 2
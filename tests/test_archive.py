@@ -0,0 +1,40 @@
+import io
+import zipfile
+
+import pytest
+
+from archive import ArchiveStore, ArchiveTooLargeError
+
+
+def entries(count, size, produced=None):
+    for index in range(count):
+        if produced is not None:
+            produced.append(index)
+        yield f"arquivo_{index}.bin", bytes(size)
+
+
+def test_build_is_cached_by_key():
+    store = ArchiveStore(max_bytes=1024 * 1024)
+    data = store.build("a", entries(3, 100))
+    assert sorted(zipfile.ZipFile(io.BytesIO(data)).namelist()) == ["arquivo_0.bin", "arquivo_1.bin", "arquivo_2.bin"]
+    produced = []
+    assert store.build("a", entries(3, 100, produced)) is data
+    assert produced == []
+
+
+def test_older_archives_are_evicted_to_stay_under_the_ceiling():
+    store = ArchiveStore(max_bytes=10_000)
+    store.build("a", entries(6, 1000))
+    store.build("b", entries(6, 1000))
+    assert store.get("a") is None
+    assert store.get("b") is not None
+    assert store.nbytes <= store.max_bytes
+
+
+def test_too_large_archive_stops_early():
+    store = ArchiveStore(max_bytes=10_000)
+    produced = []
+    with pytest.raises(ArchiveTooLargeError):
+        store.build("a", entries(100, 1000, produced))
+    assert len(produced) < 15
+    assert store.get("a") is None
@@ -0,0 +1,36 @@
+import os
+
+from benchmark import synthetic_image
+from batch import main, output_stems
+from image_engine import SOCIAL_MEDIA_PRESETS
+
+
+def test_output_stems_keep_inputs_apart():
+    paths = ["fotos/a/foto.jpg", "fotos/b/foto.png", "fotos/a/foto.png"]
+    assert output_stems(paths) == [os.path.join("a", "foto"), os.path.join("b", "foto"), os.path.join("a", "foto_2")]
+
+
+def test_same_stem_inputs_do_not_overwrite(tmp_path):
+    image = synthetic_image((120, 80), "RGB")
+    inputs = [tmp_path / "a" / "foto.jpg", tmp_path / "b" / "foto.png", tmp_path / "b" / "foto.jpg"]
+    for path in inputs:
+        path.parent.mkdir(exist_ok=True)
+        image.save(path)
+    output = tmp_path / "saida"
+
+    status = main([
+        str(tmp_path / "a"), str(tmp_path / "b"),
+        "-p", "Instagram", "-p", "Instagram/Stories",
+        "-o", str(output), "-w", "1", "--no-disk-cache",
+    ])
+
+    written = sorted(
+        os.path.relpath(os.path.join(root, name), output)
+        for root, _, names in os.walk(output) for name in names
+    )
+    # "Instagram/Stories" já está em "Instagram" e é gerado uma vez por entrada
+    assert status == 0
+    assert len(written) == len(inputs) * len(SOCIAL_MEDIA_PRESETS["Instagram"])
+    assert os.path.join("a", "foto_instagram_stories_1080x1920.jpeg") in written
+    assert os.path.join("b", "foto_instagram_stories_1080x1920.jpeg") in written
+    assert os.path.join("b", "foto_2_instagram_stories_1080x1920.png") in written
@@ -0,0 +1,37 @@
+import multiprocessing
+import os
+
+import disk_cache
+from disk_cache import DiskCache
+
+
+def hit_many(directory, count):
+    cache = DiskCache(directory)
+    for _ in range(count):
+        cache.get("chave")
+
+
+def test_hits_do_not_touch_stats_file_until_flush(tmp_path, monkeypatch):
+    monkeypatch.setattr(disk_cache, "STATS_FLUSH_SECONDS", 3600)
+    cache = DiskCache(str(tmp_path))
+    cache.put("chave", b"dados")
+    for _ in range(50):
+        assert cache.get("chave") == b"dados"
+    cache.get("ausente")
+    assert not os.path.exists(tmp_path / "stats.json")
+    assert cache.stats()["hits"] == 50
+    assert cache.stats()["misses"] == 1
+
+    cache.flush_stats()
+    assert DiskCache(str(tmp_path)).stats()["hits"] == 50
+    assert cache.stats()["hits"] == 50
+
+
+def test_counts_of_worker_processes_are_flushed_on_exit(tmp_path):
+    DiskCache(str(tmp_path)).put("chave", b"dados")
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(2) as pool:
+        pool.starmap(hit_many, [(str(tmp_path), 10), (str(tmp_path), 15)])
+        pool.close()
+        pool.join()
+    assert DiskCache(str(tmp_path)).stats()["hits"] == 25
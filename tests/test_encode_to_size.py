@@ -0,0 +1,60 @@
+import pytest
+
+from image_engine import (
+    TARGET_MAX_QUALITY,
+    TARGET_MIN_QUALITY,
+    TARGET_PROBE_STEP,
+    encode_image,
+    encode_to_size,
+)
+from test_estimate import photo_like
+
+
+@pytest.fixture(scope="module")
+def textured():
+    return photo_like((900, 600))
+
+
+@pytest.fixture(scope="module")
+def sizes_by_quality(textured):
+    """Tamanho em cada qualidade, por formato: a busca exaustiva de referência."""
+    return {
+        save_format: {
+            quality: len(encode_image(textured, save_format, quality))
+            for quality in range(TARGET_MIN_QUALITY, TARGET_MAX_QUALITY + 1)
+        }
+        for save_format in ["JPEG", "WEBP"]
+    }
+
+
+@pytest.mark.parametrize("save_format", ["JPEG", "WEBP"])
+@pytest.mark.parametrize("fraction", [0.2, 0.35, 0.5, 0.7, 0.9])
+def test_result_fits_and_is_close_to_brute_force(textured, sizes_by_quality, save_format, fraction):
+    sizes = sizes_by_quality[save_format]
+    max_bytes = int(sizes[TARGET_MAX_QUALITY] * fraction)
+    best = max(quality for quality, size in sizes.items() if size <= max_bytes)
+
+    data, quality = encode_to_size(textured, save_format, max_bytes)
+
+    assert len(data) <= max_bytes
+    assert best - TARGET_PROBE_STEP <= quality <= best
+
+
+@pytest.mark.parametrize("save_format", ["JPEG", "WEBP"])
+def test_nothing_fits_returns_min_quality(textured, save_format):
+    data, quality = encode_to_size(textured, save_format, 100)
+    assert quality == TARGET_MIN_QUALITY
+    assert data == encode_image(textured, save_format, TARGET_MIN_QUALITY)
+
+
+@pytest.mark.parametrize("save_format", ["JPEG", "WEBP"])
+def test_generous_budget_returns_max_quality(textured, save_format):
+    data, quality = encode_to_size(textured, save_format, 100 * 1024 * 1024)
+    assert quality == TARGET_MAX_QUALITY
+    assert data == encode_image(textured, save_format, TARGET_MAX_QUALITY)
+
+
+def test_format_without_quality_is_encoded_once(textured):
+    data, quality = encode_to_size(textured, "PNG", 1)
+    assert quality is None
+    assert data == encode_image(textured, "PNG")
@@ -0,0 +1,63 @@
+import pytest
+from PIL import Image
+
+from image_engine import (
+    METHODS,
+    ResizeSpec,
+    encode_image,
+    estimate_encoded_size,
+    estimate_output_size,
+    make_proxy,
+    resize_image,
+)
+
+
+def photo_like(size):
+    """Ruído somado em várias escalas, com espectro parecido com o de uma foto."""
+    texture = None
+    for octave in range(7):
+        side = 4 * 2 ** octave
+        noise = Image.effect_noise((side, max(2, side * size[1] // size[0])), 60).resize(size, Image.Resampling.BICUBIC)
+        texture = noise if texture is None else Image.blend(texture, noise, 1 / (octave + 1.5))
+    return Image.merge("RGB", (
+        texture,
+        texture.transpose(Image.Transpose.FLIP_LEFT_RIGHT),
+        texture.transpose(Image.Transpose.FLIP_TOP_BOTTOM),
+    ))
+
+
+@pytest.fixture(scope="module")
+def photo():
+    return photo_like((1800, 1200))
+
+
+@pytest.fixture(scope="module")
+def large_photo():
+    original = photo_like((3000, 2000))
+    return original, make_proxy(original)
+
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("size", [(1080, 1920), (1200, 630)])
+@pytest.mark.parametrize("save_format", ["JPEG", "WEBP", "PNG"])
+def test_output_estimate_is_close(photo, method, size, save_format):
+    spec = ResizeSpec(*size, method=method)
+    real = len(encode_image(resize_image(photo, spec), save_format, 95))
+    estimate = estimate_output_size(photo, spec, save_format, 95)
+    assert 0.8 <= estimate / real <= 1.25
+
+
+@pytest.mark.parametrize("save_format", ["JPEG", "WEBP", "PNG"])
+def test_native_estimate_is_close(photo, save_format):
+    real = len(encode_image(photo, save_format, 90))
+    assert 0.8 <= estimate_encoded_size(photo, save_format, 90) / real <= 1.25
+
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("save_format", ["JPEG", "WEBP", "PNG"])
+def test_proxy_estimate_is_close_when_output_fits_the_proxy(large_photo, method, save_format):
+    # Sem decodificar a original: a prévia basta quando a saída não é maior que ela
+    original, proxy = large_photo
+    spec = ResizeSpec(1000, 1000, method=method)
+    real = len(encode_image(resize_image(original, spec), save_format, 95))
+    assert 0.8 <= estimate_output_size(proxy, spec, save_format, 95) / real <= 1.25
@@ -0,0 +1,59 @@
+import io
+import time
+
+import pytest
+from PIL import Image
+
+import jobs
+from instrumentation import Trace
+from jobs import JOB_DONE, JobQueue, convert_job
+
+
+@pytest.fixture(scope="module")
+def queue():
+    job_queue = JobQueue(max_workers=2)
+    yield job_queue
+    job_queue.shutdown()
+
+
+@pytest.fixture(scope="module")
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def wait_all(queue, job_ids, timeout=60):
+    deadline = time.monotonic() + timeout
+    while any(queue.status(job_id).state != JOB_DONE for job_id in job_ids):
+        assert time.monotonic() < deadline, [queue.status(job_id) for job_id in job_ids]
+        time.sleep(0.05)
+
+
+def test_unread_results_survive_unrelated_submits(queue, png_bytes):
+    job_ids = [queue.submit(convert_job, png_bytes, "JPEG") for _ in range(40)]
+    wait_all(queue, job_ids)
+    other = queue.submit(convert_job, png_bytes, "PNG", key=("outra sessão", "conversion_job"))
+    assert all(queue.status(job_id).state == JOB_DONE for job_id in job_ids)
+    for job_id in job_ids:
+        assert queue.result(job_id)[:2] == b"\xff\xd8"
+    wait_all(queue, [other])
+    queue.forget(other)
+
+
+def test_results_unread_past_the_ttl_are_dropped(queue, png_bytes, monkeypatch):
+    job_id = queue.submit(convert_job, png_bytes, "JPEG")
+    wait_all(queue, [job_id])
+    monkeypatch.setattr(jobs, "JOB_RESULT_TTL_SECONDS", 0)
+    other = queue.submit(convert_job, png_bytes, "JPEG")
+    assert queue.status(job_id).state == jobs.JOB_CANCELLED
+    queue.cancel(other)
+
+
+def test_worker_stages_reach_the_reader_trace(queue, png_bytes):
+    job_id = queue.submit(convert_job, png_bytes, "WEBP")
+    wait_all(queue, [job_id])
+    trace = Trace(enabled=True)
+    encoded = queue.result(job_id, trace)
+    assert [entry["stage"] for entry in trace.stages] == ["decode", "encode"]
+    assert trace.stages[1]["bytes"] == len(encoded)
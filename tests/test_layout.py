@@ -0,0 +1,66 @@
+import os
+import random
+
+import pytest
+from PIL import Image
+
+import layout
+from batch import main, plan_batch
+from image_engine import METHODS, SOCIAL_MEDIA_PRESETS, ResizeSpec
+from layout import Layout, _geometry_numpy, _geometry_python, crop_geometry, pad_geometry, plan_layouts
+
+TARGETS = [size for presets in SOCIAL_MEDIA_PRESETS.values() for size in presets.values()]
+
+
+@pytest.fixture(scope="module")
+def bomb(tmp_path_factory):
+    # Cabeçalho acima do dobro do limite do Pillow, que levanta DecompressionBombError
+    path = tmp_path_factory.mktemp("bomba") / "bomba.png"
+    Image.new("1", (30000, 30000)).save(path)
+    return path
+
+
+@pytest.mark.skipif(layout._numpy() is None, reason="NumPy não instalado")
+@pytest.mark.parametrize("method", METHODS)
+def test_numpy_geometry_matches_python(method):
+    rng = random.Random(7)
+    sources = [(rng.randint(1, 9000), rng.randint(1, 9000)) for _ in range(200)] + [(1080, 1920), (1, 1)]
+    expected = [[tuple(values) for values in row] for row in _geometry_python(sources, TARGETS, method)]
+    actual = [[tuple(values) for values in row] for row in _geometry_numpy(sources, TARGETS, method)]
+    assert actual == expected
+
+
+def test_plan_matches_scalar_geometry():
+    specs = [ResizeSpec(*size, method=method) for size in TARGETS for method in METHODS]
+    (row,) = plan_layouts([(4000, 3000)], specs)
+    for spec, planned in zip(specs, row):
+        if spec.method == "crop":
+            assert planned == Layout(*crop_geometry((4000, 3000), spec.size))
+        elif spec.method == "pad":
+            assert planned == Layout(*pad_geometry((4000, 3000), spec.size))
+        else:
+            assert planned == Layout(*spec.size, 0, 0)
+
+
+def test_plan_batch_reads_headers_once_for_all_files(tmp_path, bomb):
+    good = tmp_path / "foto.png"
+    Image.new("RGB", (300, 200)).save(good)
+    broken = tmp_path / "quebrada.png"
+    broken.write_bytes(b"nada")
+    presets = (("Instagram", "Stories"), ("YouTube", "Thumbnail"))
+
+    rows = plan_batch([str(good), str(broken), str(bomb)], presets, "crop")
+    specs = [ResizeSpec(1080, 1920, method="crop"), ResizeSpec(1280, 720, method="crop")]
+    assert rows == [tuple(plan_layouts([(300, 200)], specs)[0]), (), ()]
+
+
+def test_oversized_input_fails_alone(tmp_path, bomb):
+    Image.new("RGB", (300, 200)).save(tmp_path / "foto.png")
+    output = tmp_path / "saida"
+
+    status = main([str(tmp_path / "foto.png"), str(bomb), "-p", "YouTube/Thumbnail",
+                   "-o", str(output), "-w", "1", "--no-disk-cache"])
+
+    assert status == 1
+    written = [name for _, _, names in os.walk(output) for name in names]
+    assert written == ["foto_youtube_thumbnail_1280x720.png"]
@@ -0,0 +1,13 @@
+import pytest
+
+from benchmark import synthetic_image
+from numpy_resample import NUMPY_AVAILABLE, VERIFY_TOLERANCE, max_difference_from_pillow
+
+pytestmark = pytest.mark.skipif(not NUMPY_AVAILABLE, reason="NumPy não instalado")
+
+
+@pytest.mark.parametrize("mode", ["L", "RGB", "RGBA"])
+@pytest.mark.parametrize("size", [(97, 61), (640, 900)], ids=["reduzir", "ampliar"])
+def test_numpy_backend_matches_pillow(mode, size):
+    image = synthetic_image((320, 240), mode)
+    assert max_difference_from_pillow(image, size) <= VERIFY_TOLERANCE
@@ -0,0 +1,25 @@
+import io
+
+from PIL import Image
+
+from image_engine import QUALITY_FAST, ResizeSpec
+from probe import plan_decode, probe_image
+
+
+def jpeg_bytes(size):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "gray").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_plan_reports_memory_of_the_decode_it_chooses():
+    probe = probe_image(jpeg_bytes((1600, 1200)))
+    assert probe.decoded_nbytes == 1600 * 1200 * 3
+
+    full = plan_decode(probe)
+    assert full.decoded_nbytes == probe.decoded_nbytes
+    assert "decodificados" in full.describe()
+
+    reduced = plan_decode(probe, ResizeSpec(100, 75, quality=QUALITY_FAST))
+    assert reduced.draft_scale > 1
+    assert reduced.decoded_nbytes == probe.decoded_nbytes // reduced.draft_scale ** 2
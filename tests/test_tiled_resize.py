@@ -0,0 +1,55 @@
+import io
+
+import pytest
+from PIL import Image, ImageChops
+
+from benchmark import synthetic_image
+from image_engine import METHODS, METHOD_PAD, ResizeSpec, output_nbytes, resize_image
+from instrumentation import Trace
+from jobs import render_job
+from tiled_resize import needs_strips, resize_bounded, resize_in_strips
+
+
+class InlineContext:
+    """Contexto de trabalho sem fila, para chamar os trabalhos no próprio processo."""
+
+    trace = Trace(enabled=False)
+
+    def report(self, done, total, stage=""):
+        pass
+
+    def check_cancelled(self):
+        pass
+
+
+def test_output_nbytes_counts_bands():
+    assert output_nbytes("RGB", ResizeSpec(10, 20)) == 600
+    assert output_nbytes("L", ResizeSpec(10, 20)) == 200
+    assert output_nbytes("RGB", ResizeSpec(10, 20, method=METHOD_PAD)) == 800
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_resize_bounded_matches_resize_image(method):
+    image = synthetic_image((300, 200), "RGB")
+    spec = ResizeSpec(120, 160, method=method)
+    assert not needs_strips(image, spec)
+    assert resize_bounded(image, spec).tobytes() == resize_image(image, spec).tobytes()
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_strips_match_full_resize(method):
+    image = synthetic_image((300, 200), "RGB")
+    spec = ResizeSpec(240, 320, method=method)
+    assert needs_strips(image, spec, threshold_mb=0)
+    stripped = resize_in_strips(image, spec, strip_height=32)
+    full = resize_image(image, spec)
+    assert stripped.size == full.size
+    # O arredondamento para 8 bits entre os eixos pode mudar um ou dois níveis nas bordas das faixas
+    assert max(high for _, high in ImageChops.difference(stripped, full).getextrema()) <= 2
+
+
+def test_render_job_full_resolution():
+    buffer = io.BytesIO()
+    synthetic_image((300, 200), "RGB").save(buffer, "PNG")
+    encoded = render_job(InlineContext(), buffer.getvalue(), ResizeSpec(90, 160, method="crop"), "JPEG")
+    assert Image.open(io.BytesIO(encoded)).size == (90, 160)
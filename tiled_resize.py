@@ -0,0 +1,147 @@
+"""Redimensionamento em faixas horizontais para saídas muito grandes.
+
+O caminho normal gera a imagem escalada inteira e depois recorta ou cola
+sobre uma tela RGBA, o que em ampliações grandes soma várias cópias da saída
+na memória. Aqui cada faixa da saída é calculada diretamente da imagem
+original com ``resize(box=...)``: o Pillow lê os pixels vizinhos fora da
+caixa, então o filtro LANCZOS tem a sobreposição correta entre faixas e o
+resultado é o mesmo do caminho normal. Só uma faixa intermediária existe por
+vez, e saídas em L/RGBA são gravadas em um arquivo temporário mapeado em
+memória em vez de ficarem na RAM.
+"""
+
+import mmap
+import tempfile
+from typing import Iterator, Optional, Tuple
+
+from PIL import Image
+
+from image_engine import (
+    FAST_REDUCING_GAP,
+    METHOD_CROP,
+    METHOD_PAD,
+    QUALITY_FAST,
+    STRIP_THRESHOLD_MB,
+    ResizeSpec,
+    check_output_budget,
+    crop_box,
+    crop_geometry,
+    output_mode,
+    output_nbytes,
+    pad_geometry,
+    resize_image,
+    resolve_anchor,
+)
+
+# Altura padrão de cada faixa, em linhas da saída
+DEFAULT_STRIP_HEIGHT = 256
+
+# Modos cujo formato bruto coincide com o armazenamento do Pillow e podem ser mapeados do disco
+SPILL_MODES = ("L", "RGBA")
+
+
+def needs_strips(image: Image.Image, spec: ResizeSpec, threshold_mb: int = STRIP_THRESHOLD_MB) -> bool:
+    """Indica se a saída é grande o bastante para ser gerada em faixas."""
+    return output_nbytes(image.mode, spec) > threshold_mb * 1024 * 1024
+
+
+def _resize_box(image: Image.Image, size: Tuple[int, int], box, spec: ResizeSpec) -> Image.Image:
+    reducing_gap = FAST_REDUCING_GAP if spec.quality == QUALITY_FAST else None
+    return image.resize(size, Image.Resampling.LANCZOS, box=box, reducing_gap=reducing_gap)
+
+
+def iter_strips(
+    image: Image.Image,
+    spec: ResizeSpec,
+    strip_height: int = DEFAULT_STRIP_HEIGHT,
+) -> Iterator[Tuple[int, Image.Image]]:
+    """Gera ``(y, faixa)`` cobrindo a saída de cima para baixo."""
+    width, height = image.size
+
+    if spec.method == METHOD_PAD:
+        scaled_width, scaled_height, paste_x, paste_y = pad_geometry(image.size, spec.size)
+        scale_y = height / scaled_height
+        for y0 in range(0, spec.height, strip_height):
+            y1 = min(spec.height, y0 + strip_height)
+            strip = Image.new('RGBA', (spec.width, y1 - y0), (255, 255, 255, 0))
+            # Parte da imagem escalada que cai nesta faixa
+            top = max(y0, paste_y)
+            bottom = min(y1, paste_y + scaled_height)
+            if top < bottom:
+                part = _resize_box(
+                    image,
+                    (scaled_width, bottom - top),
+                    (0, (top - paste_y) * scale_y, width, (bottom - paste_y) * scale_y),
+                    spec,
+                )
+                if part.mode != 'RGBA':
+                    part = part.convert('RGBA')
+                strip.paste(part, (paste_x, top - y0), part)
+            yield y0, strip
+        return
+
+    if spec.method == METHOD_CROP:
+        scaled_width, scaled_height, _, _ = crop_geometry(image.size, spec.size)
+        spec = resolve_anchor(image, (scaled_width, scaled_height), spec)
+        left, top, _, _ = crop_box((scaled_width, scaled_height), spec)
+    else:
+        scaled_width, scaled_height = spec.size
+        left, top = 0, 0
+
+    # Cada pixel da imagem escalada corresponde a (scale_x, scale_y) pixels da original
+    scale_x = width / scaled_width
+    scale_y = height / scaled_height
+    for y0 in range(0, spec.height, strip_height):
+        y1 = min(spec.height, y0 + strip_height)
+        box = (
+            left * scale_x,
+            (top + y0) * scale_y,
+            (left + spec.width) * scale_x,
+            (top + y1) * scale_y,
+        )
+        yield y0, _resize_box(image, (spec.width, y1 - y0), box, spec)
+
+
+def resize_in_strips(
+    image: Image.Image,
+    spec: ResizeSpec,
+    strip_height: int = DEFAULT_STRIP_HEIGHT,
+    spill_dir: Optional[str] = None,
+) -> Image.Image:
+    """Gera a saída faixa a faixa.
+
+    Em L/RGBA as faixas são gravadas em um arquivo temporário (em
+    ``spill_dir``) e a imagem devolvida é um mapeamento somente leitura dele;
+    nos demais modos as faixas são coladas em uma única imagem de destino.
+    """
+    mode = output_mode(image.mode, spec)
+
+    if mode in SPILL_MODES:
+        with tempfile.TemporaryFile(dir=spill_dir) as spill:
+            for _, strip in iter_strips(image, spec, strip_height):
+                spill.write(strip.tobytes())
+            spill.flush()
+            mapped = mmap.mmap(spill.fileno(), 0, access=mmap.ACCESS_READ)
+        # O mmap continua válido depois de fechar o arquivo e é mantido vivo pela imagem
+        return Image.frombuffer(mode, spec.size, mapped, "raw", mode, 0, 1)
+
+    result = Image.new(mode, spec.size)
+    if mode == "P":
+        result.putpalette(image.getpalette())
+        if "transparency" in image.info:
+            result.info["transparency"] = image.info["transparency"]
+    for y0, strip in iter_strips(image, spec, strip_height):
+        result.paste(strip, (0, y0))
+    return result
+
+
+def resize_bounded(image: Image.Image, spec: ResizeSpec, strip_height: int = DEFAULT_STRIP_HEIGHT) -> Image.Image:
+    """Como :func:`image_engine.resize_image`, mas respeitando os limites de memória.
+
+    Recusa saídas acima do limite de pixels e usa faixas quando a saída
+    passa de ``STRIP_THRESHOLD_MB``.
+    """
+    check_output_budget(spec)
+    if needs_strips(image, spec):
+        return resize_in_strips(image, spec, strip_height)
+    return resize_image(image, spec)